@@ -1,440 +1,628 @@
 import streamlit as st
-from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
-from langchain_core.runnables import RunnableSequence
 import psycopg2
 import os
 from dotenv import load_dotenv
 import hashlib
-from groq import Groq
-from gtts import gTTS
-import io
+from db import ConnectionPool, PoolExhausted
+from migrations import run_migrations
+from streaming import stream_chain, invoke_chain, StreamResult
+from response_cache import ResponseCache
+from chat_memory import HistoryManager, estimate_tokens
+from session_index import SessionListCache
+from intent_router import IntentRouter, PREVIOUS_QUESTION, answer_previous_question
+from metrics import registry, span, start_http_exporter, start_db_flusher
+from write_behind import WriteBehindQueue, WriteQueueFull
+from chat_window import trim_window, render_items
+from repository import Repository
+import time
 
 # Load environment variables from .env file to securely access API keys and database credentials
 load_dotenv()
 
-# Initialize the Groq client for potential future use (e.g., API calls), though not currently used for transcription
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Time the whole script run, from the first line to the connection going back to the pool
+script_start = time.perf_counter()
 
 # Function to hash passwords using SHA-256 for secure storage in the database
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-# Set up the PostgreSQL database connection and create necessary tables
-def init_db():
-    try:
-        # Establish connection to Neon PostgreSQL using credentials from environment variables
-        conn = psycopg2.connect(
-            host=os.getenv("PG_HOST"),
-            port=os.getenv("PG_PORT", "5432"),
-            user=os.getenv("PG_USER"),
-            password=os.getenv("PG_PASSWORD"),
-            database="linkedin",
-            sslmode="require"
-        )
-        c = conn.cursor()
-        print("Successfully connected to PostgreSQL database.")
-        
-        # Create the users table to store user credentials and data if it doesn’t already exist
-        c.execute('''CREATE TABLE IF NOT EXISTS users (
-                     user_id VARCHAR(255) PRIMARY KEY, 
-                     password VARCHAR(255), 
-                     profile_data TEXT, 
-                     job_data TEXT, 
-                     career_goals TEXT)''')
-        print("Users table created or confirmed.")
-        
-        # Ensure all required columns exist in the users table, adding any that are missing
-        for column, col_type in [
-            ('password', 'VARCHAR(255)'),
-            ('profile_data', 'TEXT'),
-            ('job_data', 'TEXT'),
-            ('career_goals', 'TEXT')
-        ]:
-            c.execute(f"SELECT column_name FROM information_schema.columns WHERE table_name='users' AND column_name='{column}'")
-            if not c.fetchone():
-                c.execute(f"ALTER TABLE users ADD COLUMN {column} {col_type}")
-                print(f"Added missing column '{column}' to users table.")
-        
-        # Create the session_history table to log chat interactions
-        c.execute('''CREATE TABLE IF NOT EXISTS session_history (
-                     user_id VARCHAR(255), 
-                     session_group VARCHAR(255), 
-                     session_id SERIAL PRIMARY KEY, 
-                     query TEXT, 
-                     response TEXT, 
-                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        print("Session history table created or confirmed.")
-        
-        # Add session_group column to session_history if it’s missing, and update older records
-        c.execute("SELECT column_name FROM information_schema.columns WHERE table_name='session_history' AND column_name='session_group'")
-        if not c.fetchone():
-            c.execute("ALTER TABLE session_history ADD COLUMN session_group VARCHAR(255)")
-            print("Added session_group column to session_history.")
-            c.execute("UPDATE session_history SET session_group = 'legacy_session' WHERE session_group IS NULL")
-            print("Assigned 'legacy_session' to existing records.")
-        
-        conn.commit()
-        print("Database initialization completed successfully.")
-        return conn, c
-    except psycopg2.Error as err:
-        st.error(f"Failed to connect to PostgreSQL: {err}")
-        print(f"Database connection error: {err}")
-        return None, None
-
-# Format profile data into a clean, readable string for use in prompts or display
-def format_profile_data(name, skills, about, experience, education):
-    context = ""
-    if name:
-        context += f"Name: {name}\n"
-    if skills:
-        context += f"Skills: {skills}\n"
-    if about:
-        context += f"About: {about}\n"
-    if experience:
-        context += f"Experience:\n{experience}\n"
-    if education:
-        context += f"Education:\n{education}"
-    return context.strip() or "No profile data provided."
-
-# Format job data similarly for consistency and clarity
-def format_job_data(title, company, skills, description):
-    context = ""
-    if title:
-        context += f"Job Title: {title}\n"
-    if company:
-        context += f"Company: {company}\n"
-    if skills:
-        context += f"Skills: {skills}\n"
-    if description:
-        context += f"Description: {description}"
-    return context.strip() or "No job data provided."
-
-# Convert text to audio using gTTS for the audio output option
-def text_to_audio(text):
-    try:
-        tts = gTTS(text=text, lang='en')
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        return audio_buffer.read()
-    except Exception as e:
-        st.error(f"Audio generation failed: {e}")
-        return None
-
-# Initialize database connection at startup
-conn, c = init_db()
-if conn is None or c is None:
+# Create the process-wide connection pool once; every Streamlit session and rerun shares it
+@st.cache_resource(show_spinner=False)
+def get_db_pool():
+    pool = ConnectionPool(
+        max_size=int(os.getenv("PG_POOL_MAX_SIZE", "10")),
+        idle_timeout=int(os.getenv("PG_POOL_IDLE_TIMEOUT", "300")),
+        health_check_interval=int(os.getenv("PG_POOL_HEALTH_CHECK_INTERVAL", "30"))
+    )
+    print("Successfully connected to PostgreSQL database (connection pool ready).")
+    # Bring the schema up to date once per process, before any request touches the tables
+    with pool.connection() as conn:
+        run_migrations(conn)
+    print("Database initialization completed successfully.")
+    return pool
+
+# Share one response cache across all sessions in this process; the Postgres tier is shared across replicas
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    return ResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600))),
+        max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "20000"))
+    )
+
+# Cache sidebar session pages per user across reruns until that user writes a new message
+@st.cache_resource(show_spinner=False)
+def get_session_list_cache():
+    return SessionListCache()
+
+SESSIONS_PAGE_SIZE = int(os.getenv("SESSIONS_PAGE_SIZE", "20"))
+
+# Only the newest CHAT_WINDOW_MESSAGES messages of a session live in session_state; older turns load CHAT_PAGE_TURNS at a time
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "40"))
+CHAT_PAGE_TURNS = int(os.getenv("CHAT_PAGE_TURNS", "10"))
+
+# Batch chat-history inserts and profile updates on a background writer so the database round trip is off the request path
+@st.cache_resource(show_spinner=False)
+def get_write_queue(_db_pool, _session_list_cache):
+    # Cached sidebar pages go stale once a batch with those users' messages commits
+    def invalidate_sessions(user_ids):
+        for user_id in user_ids:
+            _session_list_cache.invalidate(user_id)
+
+    return WriteBehindQueue(
+        _db_pool,
+        max_pending=int(os.getenv("WRITE_QUEUE_MAX_PENDING", "10000")),
+        batch_size=int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "100")),
+        flush_interval=float(os.getenv("WRITE_QUEUE_FLUSH_SECONDS", "0.5")),
+        on_flush=invalidate_sessions
+    )
+
+# Build the HTML bubble for a user message, aligned to the right
+def user_bubble_html(content):
+    return f"""
+    <div style="display: flex; justify-content: flex-end; margin: 10px 0;">
+        <div style="background-color: #e0e0e0; padding: 10px; border-radius: 10px; max-width: 70%; word-wrap: break-word;">
+            {content}
+        </div>
+    </div>
+    """
+
+# Build the HTML bubble for an assistant message, aligned to the left
+def assistant_bubble_html(content):
+    return f"""
+    <div style="display: flex; justify-content: flex-start; margin: 10px 0;">
+        <div style="background-color: #ffffff; padding: 10px; border: 1px solid #e0e0e0; border-radius: 10px; max-width: 70%; word-wrap: break-word;">
+            {content}
+        </div>
+    </div>
+    """
+
+# Build the text-to-speech pipeline the first time audio is requested and share it across the process;
+# audio chunks land in a content-addressed on-disk cache that is swept by size and age
+@st.cache_resource(show_spinner=False)
+def get_tts_pipeline():
+    from tts import TTSPipeline, AudioCache, GTTSBackend, SilentBackend
+
+    if os.getenv("TTS_BACKEND", "gtts") == "silent":
+        backend = SilentBackend(delay_seconds=float(os.getenv("TTS_SILENT_DELAY_SECONDS", "0")))
+    else:
+        backend = GTTSBackend(lang='en')
+    cache = AudioCache(os.getenv("TTS_CACHE_DIR", ".tts_cache"),
+                       max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024),
+                       max_age=float(os.getenv("TTS_CACHE_MAX_AGE_HOURS", "168")) * 3600)
+    return TTSPipeline(backend, cache, max_workers=int(os.getenv("TTS_WORKERS", "4")))
+
+# Start the metrics surface once per process: Prometheus text on METRICS_PORT and periodic snapshots to the metrics table
+@st.cache_resource(show_spinner=False)
+def start_metrics(_db_pool, _response_cache, _write_queue):
+    registry.gauge("linkedin_db_pool", lambda: {(("stat", k),): v for k, v in _db_pool.stats().items()},
+                   "Connection pool state.")
+    registry.gauge("linkedin_response_cache", lambda: {(("stat", k),): v for k, v in _response_cache.stats().items()},
+                   "LLM response cache counters.")
+    registry.gauge("linkedin_write_queue", lambda: {(("stat", k),): v for k, v in _write_queue.stats().items()},
+                   "Write-behind queue depth and totals.")
+    registry.describe("linkedin_chat_turns_total", "Chat turns by routed task and routing method.")
+    registry.describe("linkedin_write_rows_total", "Queued writes committed or dropped by the write-behind writer.")
+    registry.describe("linkedin_write_batch_failures_total", "Write-behind batches re-queued because the database was unreachable.")
+    registry.describe("linkedin_llm_time_to_first_token_seconds", "Time from sending the prompt to the first generated token.")
+    if os.getenv("METRICS_PORT"):
+        try:
+            start_http_exporter(int(os.getenv("METRICS_PORT")), host=os.getenv("METRICS_HOST", "0.0.0.0"))
+        except OSError as e:
+            print(f"Metrics exporter failed to start: {e}")
+    flush_seconds = float(os.getenv("METRICS_DB_FLUSH_SECONDS", "0"))
+    if flush_seconds > 0:
+        start_db_flusher(_db_pool, flush_seconds)
+    return True
+
+# Connect once per process. Each query below borrows a pooled connection only for its own statements,
+# so concurrent sessions never share a cursor and no connection is held while the LLM is answering.
+try:
+    db_pool = get_db_pool()
+except (psycopg2.Error, PoolExhausted) as err:
+    st.error(f"Failed to connect to PostgreSQL: {err}")
+    print(f"Database connection error: {err}")
     st.error("Database connection failed - please verify credentials in .env file.")
     st.stop()
+repo = Repository(db_pool)
+response_cache = get_response_cache()
+session_list_cache = get_session_list_cache()
+write_queue = get_write_queue(db_pool, session_list_cache)
+start_metrics(db_pool, response_cache, write_queue)
 
 # Configure the Groq LLM for generating text responses
-llm = ChatGroq(model="llama3-70b-8192", temperature=0, api_key=os.getenv("GROQ_API_KEY"))
-
-# Define the prompt template for the LLM, providing clear instructions for various tasks
-unified_prompt = PromptTemplate(
-    input_variables=["query", "profile_context", "job_context", "career_goals", "chat_history"],
-    template="""
-    You’re a LinkedIn profile optimization assistant here to help users polish their professional presence. You’ve got access to the following info:
-    - User’s Profile: {profile_context}
-    - Job Details: {job_context}
-    - Career Goals: {career_goals}
-
-    Here’s what’s been said in this session so far:
-    {chat_history}
-
-    The user just asked: "{query}"
-
-    **Here’s what I need you to do:**
-    - Stick strictly to what the user is asking for - no extra fluff or unsolicited advice unless they explicitly want it.
-    - Figure out what they’re after based on these categories and give a spot-on answer:
-      - If they say "profile analysis" or "analyze my profile," dig into their profile data ({profile_context}). Point out what’s strong, what’s weak, and suggest specific tweaks. Flag anything missing that could help.
-      - If it’s "job fit," "job match," or "analyze job," compare their profile ({profile_context}) to the job details ({job_context}). Give a match score from 0 to 100, explain why, and recommend upgrades. Note if data’s missing.
-      - For "enhance content" or "improve profile," take their profile sections ({profile_context}) and rewrite them to shine - align with the job ({job_context}) if it’s there, or just use LinkedIn best practices if not.
-      - If they want "career guidance" or "counseling," use their profile ({profile_context}) and goals ({career_goals}) to offer tailored advice. Highlight gaps in skills or experience and suggest practical next steps or resources.
-      - For "cover letter," whip up a custom cover letter using their profile ({profile_context}) and job details ({job_context}). Call out any missing info that’d make it better.
-      - If they ask about the "previous question" or "last question," check the chat history ({chat_history}), find the last thing they asked, and repeat or answer it clearly.
-      - For anything else, give a concise, relevant reply based on what you’ve got ({profile_context}, {job_context}, {career_goals}, {chat_history}). If it’s unclear what they mean, say so and ask them to clarify.
-    - Don’t mash up different tasks unless they specifically ask for a combo. Keep it clean and focused.
-    - Write naturally, like you’re explaining it to a friend - no fancy formatting tricks, just plain, clear language.
-    """
-)
-
-# Create a sequence to chain the prompt with the LLM for smooth execution
-unified_chain = RunnableSequence(unified_prompt | llm)
-
-# Start the Streamlit app with a clear title
-st.title("LinkedIn Optimizer Chat")
-
-# Initialize session state variables to manage login and chat context
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-    st.session_state.user_id = None
-    st.session_state.profile_context = ""
-    st.session_state.job_context = ""
-    st.session_state.career_goals = ""
-    st.session_state.chat_history = []
-    st.session_state.current_session = None
-    st.session_state.input_value = ""
-    st.session_state.last_input = ""
-
-# Handle login and signup before showing the main app
-if not st.session_state.logged_in:
-    st.subheader("Login")
-    login_email = st.text_input("Email", key="login_email")
-    login_password = st.text_input("Password", type="password", key="login_password")
+LLM_MODEL = "llama3-70b-8192"
+
+# Build the Groq LLM and its chains on first use and share them across sessions and reruns.
+# langchain and the Groq client are only imported here, so pages that never call the LLM (like login) don't load them.
+# LLM_BACKENDS lists the Groq models to hedge across, in order of preference; a slow first token is hedged to the
+# next healthy one after that model's recent p95, and a failing model is skipped by its circuit breaker.
+@st.cache_resource(show_spinner=False)
+def get_llm_chains():
+    from langchain_groq import ChatGroq
+    from langchain_core.runnables import RunnableSequence
+    from prompts import unified_prompt, summary_prompt, TASK_PROMPTS
+    from llm_executor import Backend, CircuitBreaker, HedgedExecutor, HedgedChatModel
+
+    models = [m.strip() for m in os.getenv("LLM_BACKENDS", LLM_MODEL).split(",") if m.strip()]
+    deadline = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+    backends = [
+        # Retries are left to the executor: it fails over to another backend first, and retries with backoff
+        # (LLM_RETRIES times) only when none is left, as in the default single-backend setup.
+        # Cancelling a hedge loser only stops reading its stream, so the HTTP timeout is what ends a call
+        # stuck before its first token; it is capped at the request deadline.
+        Backend(model, ChatGroq(model=model, temperature=0, api_key=os.getenv("GROQ_API_KEY"), max_retries=0,
+                                request_timeout=deadline),
+                CircuitBreaker(failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                               reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))))
+        for model in models
+    ]
+    executor = HedgedExecutor(
+        backends,
+        hedge=os.getenv("LLM_HEDGE", "1") != "0",
+        default_hedge_delay=float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "2")),
+        deadline=deadline,
+        retries=int(os.getenv("LLM_RETRIES", "2"))
+    )
+    registry.gauge("linkedin_llm_backend",
+                   lambda: {(("backend", name), ("stat", k)): v for name, stats in executor.stats().items()
+                            for k, v in stats.items() if v is not None},
+                   "Per-backend LLM requests, hedges, failures, latency percentiles and breaker state.")
+    llm = HedgedChatModel(executor=executor)
+    return {
+        "llm": llm,
+        "executor": executor,
+        # Create a sequence to chain the prompt with the LLM for smooth execution
+        "unified": RunnableSequence(unified_prompt | llm),
+        # One slim chain per routed task; "general" falls back to the unified prompt
+        "tasks": {task: RunnableSequence(prompt | llm) for task, prompt in TASK_PROMPTS.items()},
+        # Chain that folds turns scrolling out of the verbatim window into a running session summary
+        "summary": RunnableSequence(summary_prompt | llm),
+    }
+
+# Train the local intent model once per process instead of on every rerun
+@st.cache_resource(show_spinner=False)
+def get_intent_router():
+    return IntentRouter()
+
+intent_router = get_intent_router()
+
+# Fold older turns into the stored summary incrementally
+def summarize_turns(summary, new_turns):
+    response = get_llm_chains()["summary"].invoke({"summary": summary or "None yet.", "new_turns": new_turns})
+    return response.content if hasattr(response, 'content') else str(response)
+
+# One manager per process, so its background summary worker is shared across sessions and reruns
+@st.cache_resource(show_spinner=False)
+def get_history_manager():
+    return HistoryManager(
+        summarize_turns,
+        recent_turns=int(os.getenv("HISTORY_RECENT_TURNS", "6")),
+        token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")),
+        fold_turns=int(os.getenv("HISTORY_FOLD_TURNS", "4"))
+    )
+
+history_manager = get_history_manager()
+
+# Run the page; st.rerun() and st.stop() also pass through the finally block
+try:
+    # Start the Streamlit app with a clear title
+    st.title("LinkedIn Optimizer Chat")
+
+    # Initialize session state variables to manage login and chat context
+    if 'logged_in' not in st.session_state:
+        st.session_state.logged_in = False
+        st.session_state.user_id = None
+        st.session_state.profile_context = ""
+        st.session_state.job_context = ""
+        st.session_state.career_goals = ""
+        st.session_state.chat_history = []
+        st.session_state.chat_offset = 0
+        st.session_state.current_session = None
+        st.session_state.input_value = ""
+        st.session_state.last_input = ""
+
+    # Handle login and signup before showing the main app
+    if not st.session_state.logged_in:
+        st.subheader("Login")
+        login_email = st.text_input("Email", key="login_email")
+        login_password = st.text_input("Password", type="password", key="login_password")
     
-    if st.button("Login"):
-        if login_email and login_password:
-            hashed_password = hash_password(login_password)
-            c.execute("SELECT profile_data, job_data, career_goals FROM users WHERE user_id=%s AND password=%s", (login_email, hashed_password))
-            result = c.fetchone()
-            if result:
-                # Successful login - populate session state with user data
-                st.session_state.logged_in = True
-                st.session_state.user_id = login_email
-                st.session_state.profile_context = result[0] if result[0] else ""
-                st.session_state.job_context = result[1] if result[1] else ""
-                st.session_state.career_goals = result[2] if result[2] else ""
-                st.session_state.chat_history = []
-                st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
-                st.session_state.input_value = ""
-                st.session_state.last_input = ""
-                st.success("Login successful - welcome back!")
-                print(f"User {login_email} logged in with session: {st.session_state.current_session}")
-                st.rerun()
+        if st.button("Login"):
+            if login_email and login_password:
+                hashed_password = hash_password(login_password)
+                # Profile edits from an earlier session may still be queued
+                write_queue.sync(login_email)
+                try:
+                    with span("login_query"):
+                        result = repo.authenticate(login_email, hashed_password)
+                except (psycopg2.Error, PoolExhausted) as e:
+                    st.error(f"Login is unavailable right now: {e}")
+                    print(f"Login query failed: {e}")
+                    st.stop()
+                if result:
+                    # Successful login - populate session state with user data
+                    st.session_state.logged_in = True
+                    st.session_state.user_id = login_email
+                    st.session_state.profile_context = result[0] if result[0] else ""
+                    st.session_state.job_context = result[1] if result[1] else ""
+                    st.session_state.career_goals = result[2] if result[2] else ""
+                    st.session_state.chat_history = []
+                    st.session_state.chat_offset = 0
+                    st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
+                    st.session_state.input_value = ""
+                    st.session_state.last_input = ""
+                    st.success("Login successful - welcome back!")
+                    print(f"User {login_email} logged in with session: {st.session_state.current_session}")
+                    st.rerun()
+                else:
+                    st.error("Invalid email or password - please check and retry.")
             else:
-                st.error("Invalid email or password - please check and retry.")
-        else:
-            st.error("Both email and password are required.")
+                st.error("Both email and password are required.")
 
-    st.subheader("Sign Up")
-    signup_email = st.text_input("Email", key="signup_email")
-    signup_password = st.text_input("Password", type="password", key="signup_password")
+        st.subheader("Sign Up")
+        signup_email = st.text_input("Email", key="signup_email")
+        signup_password = st.text_input("Password", type="password", key="signup_password")
     
-    if st.button("Sign Up"):
-        if signup_email and signup_password:
-            hashed_password = hash_password(signup_password)
-            try:
-                c.execute("INSERT INTO users (user_id, password) VALUES (%s, %s)", (signup_email, hashed_password))
-                conn.commit()
-                # New user created - log them in automatically
-                st.session_state.logged_in = True
-                st.session_state.user_id = signup_email
-                st.session_state.profile_context = ""
-                st.session_state.job_context = ""
-                st.session_state.career_goals = ""
-                st.session_state.chat_history = []
-                st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
-                st.session_state.input_value = ""
-                st.session_state.last_input = ""
-                st.success("Signup complete - you’re logged in!")
-                print(f"User {signup_email} signed up with session: {st.session_state.current_session}")
-                st.rerun()
-            except psycopg2.IntegrityError:
-                st.error("Email already in use - please log in instead.")
-        else:
-            st.error("Email and password are required for signup.")
-else:
-    user_id = st.session_state.user_id
-
-    # Sidebar for user data input and session management
-    with st.sidebar:
-        st.markdown(f"### Hello, {user_id}!")  
+        if st.button("Sign Up"):
+            if signup_email and signup_password:
+                hashed_password = hash_password(signup_password)
+                try:
+                    repo.create_user(signup_email, hashed_password)
+                    # New user created - log them in automatically
+                    st.session_state.logged_in = True
+                    st.session_state.user_id = signup_email
+                    st.session_state.profile_context = ""
+                    st.session_state.job_context = ""
+                    st.session_state.career_goals = ""
+                    st.session_state.chat_history = []
+                    st.session_state.chat_offset = 0
+                    st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
+                    st.session_state.input_value = ""
+                    st.session_state.last_input = ""
+                    st.success("Signup complete - you’re logged in!")
+                    print(f"User {signup_email} signed up with session: {st.session_state.current_session}")
+                    st.rerun()
+                except psycopg2.IntegrityError:
+                    st.error("Email already in use - please log in instead.")
+                except (psycopg2.Error, PoolExhausted) as e:
+                    st.error(f"Signup is unavailable right now: {e}")
+                    print(f"Signup failed: {e}")
+            else:
+                st.error("Email and password are required for signup.")
+    else:
+        user_id = st.session_state.user_id
+
+        # Sidebar for user data input and session management
+        with st.sidebar:
+            st.markdown(f"### Hello, {user_id}!")  
         
-        st.header("Profile Setup")
+            st.header("Profile Setup")
         
-        st.subheader("Your Profile")
-        profile_name = st.text_input("Name", value="Prasad Gavhane" if not st.session_state.profile_context else "", key="profile_name")
-        profile_skills = st.text_input("Skills", value="Python, Generative AI" if not st.session_state.profile_context else "", key="profile_skills")
-        profile_about = st.text_area("About", value="Experienced software engineer with a focus on AI and data analytics." if not st.session_state.profile_context else "", key="profile_about")
-        profile_experience = st.text_area("Experience", value="Senior Software Engineer at LTIMindtree (2020-Present): Worked on Generative AI projects.\nSoftware Engineer at XYZ Corp (2018-2020): Developed Python-based applications." if not st.session_state.profile_context else "", key="profile_experience")
-        profile_education = st.text_area("Education", value="B.Tech from IIT(ISM) Dhanbad (2014-2018)" if not st.session_state.profile_context else "", key="profile_education")
+            st.subheader("Your Profile")
+            profile_name = st.text_input("Name", value="Prasad Gavhane" if not st.session_state.profile_context else "", key="profile_name")
+            profile_skills = st.text_input("Skills", value="Python, Generative AI" if not st.session_state.profile_context else "", key="profile_skills")
+            profile_about = st.text_area("About", value="Experienced software engineer with a focus on AI and data analytics." if not st.session_state.profile_context else "", key="profile_about")
+            profile_experience = st.text_area("Experience", value="Senior Software Engineer at LTIMindtree (2020-Present): Worked on Generative AI projects.\nSoftware Engineer at XYZ Corp (2018-2020): Developed Python-based applications." if not st.session_state.profile_context else "", key="profile_experience")
+            profile_education = st.text_area("Education", value="B.Tech from IIT(ISM) Dhanbad (2014-2018)" if not st.session_state.profile_context else "", key="profile_education")
         
-        if st.button("Save Profile", key="save_profile"):
-            profile_context = format_profile_data(profile_name, profile_skills, profile_about, profile_experience, profile_education)
-            st.session_state.profile_context = profile_context
-            c.execute("UPDATE users SET profile_data=%s WHERE user_id=%s", (profile_context, user_id))
-            conn.commit()
-            st.success("Profile data saved successfully.")
-            print(f"Profile updated for {user_id}: {profile_context}")
-
-        st.subheader("Job Details")
-        job_title = st.text_input("Job Title", value="Senior Software Engineer" if not st.session_state.job_context else "", key="job_title")
-        job_company = st.text_input("Company", value="TechCorp" if not st.session_state.job_context else "", key="job_company")
-        job_skills = st.text_input("Skills", value="Python, Generative AI, Software Development" if not st.session_state.job_context else "", key="job_skills")
-        job_description = st.text_area("Description", value="Seeking a Senior Software Engineer with expertise in Python, Generative AI, and software development." if not st.session_state.job_context else "", key="job_description")
+            if st.button("Save Profile", key="save_profile"):
+                from prompts import format_profile_data
+                profile_context = format_profile_data(profile_name, profile_skills, profile_about, profile_experience, profile_education)
+                st.session_state.profile_context = profile_context
+                try:
+                    write_queue.update_user(user_id, "profile_data", profile_context)
+                    # Cached answers were built from the old data: drop them from memory now and from the table with the next batch
+                    response_cache.forget_user(user_id)
+                    write_queue.invalidate_response_cache(user_id)
+                    st.success("Profile data saved successfully.")
+                    print(f"Profile updated for {user_id}: {profile_context}")
+                except WriteQueueFull as e:
+                    st.error(f"Could not save - please retry in a moment: {e}")
+
+            st.subheader("Job Details")
+            job_title = st.text_input("Job Title", value="Senior Software Engineer" if not st.session_state.job_context else "", key="job_title")
+            job_company = st.text_input("Company", value="TechCorp" if not st.session_state.job_context else "", key="job_company")
+            job_skills = st.text_input("Skills", value="Python, Generative AI, Software Development" if not st.session_state.job_context else "", key="job_skills")
+            job_description = st.text_area("Description", value="Seeking a Senior Software Engineer with expertise in Python, Generative AI, and software development." if not st.session_state.job_context else "", key="job_description")
         
-        if st.button("Save Job Details", key="save_job"):
-            job_context = format_job_data(job_title, job_company, job_skills, job_description)
-            st.session_state.job_context = job_context
-            c.execute("UPDATE users SET job_data=%s WHERE user_id=%s", (job_context, user_id))
-            conn.commit()
-            st.success("Job details saved successfully.")
-            print(f"Job details updated for {user_id}: {job_context}")
-
-        st.subheader("Career Goals")
-        career_goals = st.text_area("Enter your career goals:", value=st.session_state.career_goals, key="goals")
-        if st.button("Save Goals", key="save_goals"):
-            if career_goals:
-                st.session_state.career_goals = career_goals
-                c.execute("UPDATE users SET career_goals=%s WHERE user_id=%s", (career_goals, user_id))
-                conn.commit()
-                st.success("Career goals saved successfully.")
-                print(f"Career goals updated for {user_id}: {career_goals}")
-            else:
-                st.error("Please enter career goals before saving.")
-
-        st.subheader("Session Management")
-        if st.button("Create New Session", key="new_session"):
-            st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
-            st.session_state.chat_history = []
-            st.session_state.input_value = ""
-            st.session_state.last_input = ""
-            st.success("New session created.")
-            print(f"New session started for {user_id}: {st.session_state.current_session}")
-
-        st.subheader("Session History")
-        try:
-            # Fetch a summary of past sessions for the user, showing the first query of each group
-            c.execute("""
-                SELECT session_group, query, timestamp
-                FROM session_history 
-                WHERE user_id=%s 
-                AND session_id IN (
-                    SELECT MIN(session_id) 
-                    FROM session_history 
-                    WHERE user_id=%s 
-                    GROUP BY session_group
-                )
-                ORDER BY timestamp DESC
-            """, (user_id, user_id))
-            sessions = c.fetchall()
-            for session_group, first_query, _ in sessions:
-                session_group = session_group if session_group else "legacy_session"
-                summary = (first_query[:30] + "...") if len(first_query) > 30 else first_query
-                if st.button(f"Session: {summary}", key=f"hist_{session_group}"):
-                    st.session_state.current_session = session_group
+            if st.button("Save Job Details", key="save_job"):
+                from prompts import format_job_data
+                job_context = format_job_data(job_title, job_company, job_skills, job_description)
+                st.session_state.job_context = job_context
+                try:
+                    write_queue.update_user(user_id, "job_data", job_context)
+                    # Cached answers were built from the old data: drop them from memory now and from the table with the next batch
+                    response_cache.forget_user(user_id)
+                    write_queue.invalidate_response_cache(user_id)
+                    st.success("Job details saved successfully.")
+                    print(f"Job details updated for {user_id}: {job_context}")
+                except WriteQueueFull as e:
+                    st.error(f"Could not save - please retry in a moment: {e}")
+
+            st.subheader("Career Goals")
+            career_goals = st.text_area("Enter your career goals:", value=st.session_state.career_goals, key="goals")
+            if st.button("Save Goals", key="save_goals"):
+                if career_goals:
+                    st.session_state.career_goals = career_goals
+                    try:
+                        write_queue.update_user(user_id, "career_goals", career_goals)
+                        # Cached answers were built from the old data: drop them from memory now and from the table with the next batch
+                        response_cache.forget_user(user_id)
+                        write_queue.invalidate_response_cache(user_id)
+                        st.success("Career goals saved successfully.")
+                        print(f"Career goals updated for {user_id}: {career_goals}")
+                    except WriteQueueFull as e:
+                        st.error(f"Could not save - please retry in a moment: {e}")
+                else:
+                    st.error("Please enter career goals before saving.")
+
+            st.subheader("Session Management")
+            if st.button("Create New Session", key="new_session"):
+                st.session_state.current_session = f"session_{hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]}"
+                st.session_state.chat_history = []
+                st.session_state.chat_offset = 0
+                st.session_state.input_value = ""
+                st.session_state.last_input = ""
+                st.success("New session created.")
+                print(f"New session started for {user_id}: {st.session_state.current_session}")
+
+            st.subheader("Session History")
+            try:
+                # Fetch past sessions from the maintained sessions table, one keyset page at a time
+                sessions = []
+                cursor = None
+                with span("session_list_query"):
+                    for _ in range(st.session_state.setdefault("session_pages", 1)):
+                        page, cursor = repo.sessions_page(user_id, after=cursor, limit=SESSIONS_PAGE_SIZE, session_list_cache=session_list_cache)
+                        sessions.extend(page)
+                        if cursor is None:
+                            break
+                    # Messages still in the write queue are not in the sessions table yet
+                    sessions = write_queue.merge_pending_sessions(user_id, sessions)
+                for session_group, first_query, _, _ in sessions:
+                    first_query = first_query or ""
+                    summary = (first_query[:30] + "...") if len(first_query) > 30 else first_query
+                    if st.button(f"Session: {summary}", key=f"hist_{session_group}"):
+                        st.session_state.current_session = session_group
+                        st.session_state.input_value = ""
+                        st.session_state.last_input = ""
+                        write_queue.sync(user_id)
+                        # Only the newest window of the session is loaded; older turns are fetched on request
+                        with span("session_history_query"):
+                            st.session_state.chat_history, st.session_state.chat_offset = repo.latest_turns(
+                                user_id, session_group, CHAT_WINDOW_MESSAGES
+                            )
+                        st.success(f"Loaded session: {summary}")
+                if cursor is not None and st.button("Show older sessions", key="older_sessions"):
+                    st.session_state.session_pages += 1
+                    st.rerun()
+            except (psycopg2.Error, PoolExhausted) as e:
+                st.warning(f"Failed to load session history: {e}. Using fallback method.")
+                print(f"Session history query failed: {e}")
+                # Same pool, so this can fail for the same reason; then there is nothing to offer
+                try:
+                    history = repo.recent_history(user_id, limit=10)
+                except (psycopg2.Error, PoolExhausted) as e:
+                    print(f"Fallback history query failed: {e}")
+                    history = []
+                if history and st.button("Load Legacy Session", key="hist_legacy"):
+                    st.session_state.current_session = "legacy_session"
                     st.session_state.chat_history = []
+                    st.session_state.chat_offset = 0
                     st.session_state.input_value = ""
                     st.session_state.last_input = ""
-                    c.execute("SELECT query, response FROM session_history WHERE user_id=%s AND session_group=%s ORDER BY session_id", (user_id, session_group))
-                    history = c.fetchall()
                     for query, response in history:
                         st.session_state.chat_history.append({"role": "You", "content": query})
                         st.session_state.chat_history.append({"role": "Assistant", "content": response})
-                    st.success(f"Loaded session: {summary}")
-        except psycopg2.Error as e:
-            st.warning(f"Failed to load session history: {e}. Using fallback method.")
-            print(f"Session history query failed: {e}")
-            c.execute("SELECT query, response FROM session_history WHERE user_id=%s ORDER BY timestamp DESC LIMIT 10", (user_id,))
-            history = c.fetchall()
-            if history and st.button("Load Legacy Session", key="hist_legacy"):
-                st.session_state.current_session = "legacy_session"
-                st.session_state.chat_history = []
-                st.session_state.input_value = ""
-                st.session_state.last_input = ""
-                for query, response in history:
-                    st.session_state.chat_history.append({"role": "You", "content": query})
-                    st.session_state.chat_history.append({"role": "Assistant", "content": response})
-                st.success("Loaded legacy session data.")
-
-    # Display the current session ID in the main area
-    st.markdown(f"**Current Session: {st.session_state.current_session[-8:]}**")
-    st.markdown("I can help with profile analysis, job fit analysis, content enhancement, career counseling, or cover letter generation. What would you like to do?")
-
-    # Show chat history with user messages on the right and assistant on the left
-    for message in st.session_state.chat_history:
-        if message["role"] == "You":
-            st.markdown(
-                f"""
-                <div style="display: flex; justify-content: flex-end; margin: 10px 0;">
-                    <div style="background-color: #e0e0e0; padding: 10px; border-radius: 10px; max-width: 70%; word-wrap: break-word;">
-                        {message['content']}
-                    </div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        else:
-            if isinstance(message["content"], tuple) and len(message["content"]) == 2:
-                text_response, audio_data = message["content"]
-                st.markdown(
-                    f"""
-                    <div style="display: flex; justify-content: flex-start; margin: 10px 0;">
-                        <div style="background-color: #ffffff; padding: 10px; border: 1px solid #e0e0e0; border-radius: 10px; max-width: 70%; word-wrap: break-word;">
-                            {text_response}
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                st.audio(audio_data, format="audio/mp3")
-            else:
-                st.markdown(
-                    f"""
-                    <div style="display: flex; justify-content: flex-start; margin: 10px 0;">
-                        <div style="background-color: #ffffff; padding: 10px; border: 1px solid #e0e0e0; border-radius: 10px; max-width: 70%; word-wrap: break-word;">
-                            {message['content']}
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-
-    # Form for user input with text entry and output type selection
-    with st.form(key="chat_form", clear_on_submit=True):
-        st.write("Ask your question:")
-        user_input = st.text_input("Type your question:", key="chat_input", value="", label_visibility="collapsed")
-        output_type = st.selectbox("Select output type:", ["Text", "Audio"], index=0, key="output_type")
-        submit_button = st.form_submit_button(label="Ask")
-
-        # Process user input when the form is submitted
-        if submit_button and user_input:
-            query = user_input
-            # Construct chat history string to provide context to the LLM
-            chat_history_str = "\n".join(
-                f"{msg['role']}: {msg['content'][0] if isinstance(msg['content'], tuple) else msg['content']}"
-                for msg in st.session_state.chat_history
-            ) if st.session_state.chat_history else "No previous chat history in this session."
-
-            # Send the query to the LLM with all relevant context
-            response = unified_chain.invoke({
-                "query": query,
-                "profile_context": st.session_state.profile_context or "No profile data provided.",
-                "job_context": st.session_state.job_context or "No job data provided.",
-                "career_goals": st.session_state.career_goals or "No career goals provided.",
-                "chat_history": chat_history_str
-            })
-
-            response_text = response.content if hasattr(response, 'content') else str(response)
-
-            # Handle the selected output type (text or audio)
-            if output_type == "Audio":
-                audio_data = text_to_audio(response_text)
-                if audio_data:
-                    response_content = (response_text, audio_data)
-                else:
-                    response_content = response_text
-            else:
-                response_content = response_text
+                    st.success("Loaded legacy session data.")
 
-            # Update chat history with the new query and response
-            st.session_state.chat_history.append({"role": "You", "content": query})
-            st.session_state.chat_history.append({"role": "Assistant", "content": response_content})
+        # Display the current session ID in the main area
+        st.markdown(f"**Current Session: {st.session_state.current_session[-8:]}**")
+        st.markdown("I can help with profile analysis, job fit analysis, content enhancement, career counseling, or cover letter generation. What would you like to do?")
 
-            # Store the interaction in the database for persistence
+        # Older turns of a long session stay in the database until asked for, one keyset page at a time
+        if st.session_state.setdefault("chat_offset", 0) > 0 and st.button("Load earlier messages", key="older_messages"):
             try:
-                c.execute("INSERT INTO session_history (user_id, session_group, query, response) VALUES (%s, %s, %s, %s)", 
-                          (user_id, st.session_state.current_session, query, response_text))
-                conn.commit()
-            except psycopg2.Error as e:
-                st.warning(f"Failed to save chat to history: {e}. Proceeding without saving.")
-                print(f"Database insert error: {e}")
+                write_queue.sync(user_id)
+                with span("older_messages_query"):
+                    older = repo.older_turns(user_id, st.session_state.current_session, st.session_state.chat_history, CHAT_PAGE_TURNS)
+                st.session_state.chat_history = older + st.session_state.chat_history
+                st.session_state.chat_offset = max(0, st.session_state.chat_offset - len(older)) if older else 0
+            except (psycopg2.Error, PoolExhausted) as e:
+                st.warning(f"Failed to load earlier messages: {e}")
+                print(f"Older messages query failed: {e}")
+
+        # Show chat history with user messages on the right and assistant on the left.
+        # Bubbles are built once per message and sent as a few markdown blocks instead of one element per message.
+        for item in render_items(st.session_state.chat_history, user_bubble_html, assistant_bubble_html):
+            if item[0] == "html":
+                st.markdown(item[1], unsafe_allow_html=True)
+            # Session state only holds references to cached audio files, never the audio bytes
+            elif os.path.exists(item[1]):
+                st.audio(item[1], format=item[2])
+
+        # Reserve space above the form so a streamed answer appears in the chat, not inside the form
+        live_turn = st.container()
+
+        # Form for user input with text entry and output type selection
+        with st.form(key="chat_form", clear_on_submit=True):
+            st.write("Ask your question:")
+            user_input = st.text_input("Type your question:", key="chat_input", value="", label_visibility="collapsed")
+            output_type = st.selectbox("Select output type:", ["Text", "Audio"], index=0, key="output_type")
+            stream_output = st.checkbox("Stream response as it is generated", value=True, key="stream_output")
+            skip_cache = st.checkbox("Fresh answer (skip cache)", value=False, key="skip_cache")
+            submit_button = st.form_submit_button(label="Ask")
+
+            # Process user input when the form is submitted
+            if submit_button and user_input:
+                query = user_input
+                # Pick the task locally so only the context that task needs goes into the prompt
+                task, confidence, route_method = intent_router.route(query)
+                registry.inc("linkedin_chat_turns_total", {"task": task, "route": route_method})
+
+                with live_turn:
+                    st.markdown(user_bubble_html(query), unsafe_allow_html=True)
+                    assistant_slot = st.empty()
+
+                # For audio output, synthesize each sentence on the TTS worker pool as soon as it is complete
+                tts_pipeline = get_tts_pipeline() if output_type == "Audio" else None
+                audio_feed = tts_pipeline.feeder() if tts_pipeline else None
+
+                def show_token(delta, text):
+                    assistant_slot.markdown(assistant_bubble_html(text + " ▌"), unsafe_allow_html=True)
+                    if audio_feed:
+                        audio_feed.feed(delta)
+
+                cached_response = None
+                if task == PREVIOUS_QUESTION:
+                    # Answered straight from the session's history - no LLM call needed
+                    answer_start = time.perf_counter()
+                    answer = answer_previous_question(st.session_state.chat_history)
+                    answer_ms = (time.perf_counter() - answer_start) * 1000
+                    result = StreamResult(text=answer, ttft_ms=answer_ms, total_ms=answer_ms, chunks=1)
+                    prompt_tokens = 0
+                    print(f"Prompt for {user_id}: task {task} via {route_method}, answered from history without the LLM")
+                else:
+                    # Loaded on the first question rather than with the page
+                    from prompts import TASK_PROMPTS, unified_prompt, prompt_inputs
+                    from llm_executor import LLMUnavailable
+                    llm_chains = get_llm_chains()
+                    task_chains = llm_chains["tasks"]
+
+                    with span("prompt_assembly", task=task):
+                        # Construct a bounded chat history (rolling summary plus recent turns) to provide context to the LLM
+                        chat_history_str, history_stats = history_manager.build(
+                            repo.connection, user_id, st.session_state.current_session,
+                            st.session_state.chat_history, st.session_state.setdefault("history_memory", {}),
+                            offset=st.session_state.chat_offset
+                        )
+
+                        chain_inputs = {
+                            "query": query,
+                            "profile_context": st.session_state.profile_context or "No profile data provided.",
+                            "job_context": st.session_state.job_context or "No job data provided.",
+                            "career_goals": st.session_state.career_goals or "No career goals provided.",
+                            "chat_history": chat_history_str
+                        }
+                        task_prompt = TASK_PROMPTS[task]
+                        task_inputs = prompt_inputs(task_prompt, chain_inputs)
+                        prompt_tokens = estimate_tokens(task_prompt.format(**task_inputs))
+                        unified_tokens = estimate_tokens(unified_prompt.format(**chain_inputs))
+                    print(f"Prompt for {user_id}: task {task} via {route_method} ({confidence:.2f}), ~{prompt_tokens} tokens "
+                          f"vs ~{unified_tokens} with the unified prompt ({100 * (1 - prompt_tokens / max(unified_tokens, 1)):.0f}% fewer); {history_stats}")
+
+                    # Send the query to the LLM with the task's context, rendering tokens into the assistant bubble as they arrive
+                    cache_key = ResponseCache.make_key(task_inputs, template=task_prompt.template, model=LLM_MODEL)
+                    if skip_cache:
+                        response_cache.record_bypass()
+                    else:
+                        with span("cache_lookup"):
+                            lookup_start = time.perf_counter()
+                            # The cache is best-effort: without a connection the turn just goes to the LLM
+                            try:
+                                with repo.connection() as conn:
+                                    cached_response = response_cache.get(conn, user_id, cache_key)
+                            except (psycopg2.Error, PoolExhausted) as e:
+                                print(f"Response cache lookup skipped for {user_id}: {e}")
+                            lookup_ms = (time.perf_counter() - lookup_start) * 1000
+
+                    if cached_response is not None:
+                        result = StreamResult(text=cached_response, ttft_ms=lookup_ms, total_ms=lookup_ms, chunks=1)
+                        print(f"Response cache hit for {user_id}: {response_cache.stats()}")
+                    else:
+                        try:
+                            with span("llm_generate", task=task):
+                                if stream_output:
+                                    result = stream_chain(
+                                        task_chains[task],
+                                        task_inputs,
+                                        on_token=show_token
+                                    )
+                                else:
+                                    with st.spinner("Thinking..."):
+                                        result = invoke_chain(task_chains[task], task_inputs)
+                        except LLMUnavailable as e:
+                            print(f"LLM error for {user_id}: {e}")
+                            assistant_slot.empty()
+                            st.error("The AI service is not responding right now - please try again in a moment.")
+                            st.stop()
+                        registry.observe("linkedin_llm_time_to_first_token_seconds", result.ttft_ms / 1000, {"task": task})
+                        # Never lose a generated answer over the cache write
+                        try:
+                            with repo.connection() as conn:
+                                response_cache.put(conn, user_id, cache_key, result.text)
+                        except (psycopg2.Error, PoolExhausted) as e:
+                            print(f"Response cache store skipped for {user_id}: {e}")
+                assistant_slot.markdown(assistant_bubble_html(result.text), unsafe_allow_html=True)
+                print(f"Response for {user_id}: time to first token {result.ttft_ms:.0f} ms, total {result.total_ms:.0f} ms, {result.chunks} chunks")
+
+                response_text = result.text
+
+                # Handle the selected output type (text or audio)
+                assistant_message = {"role": "Assistant", "content": response_text}
+                if audio_feed:
+                    if not audio_feed.futures and not audio_feed.buffer:
+                        # Cached or non-streamed answers arrive in one piece
+                        audio_feed.feed(response_text)
+                    tts_start = time.perf_counter()
+                    audio_path = None
+                    with span("text_to_audio"):
+                        # None if any sentence still failed after a retry, so a partial answer is never saved
+                        audio_paths = audio_feed.wait()
+                        # Sentences were synthesized in parallel; store them as one file so the answer plays in one player
+                        if audio_paths:
+                            try:
+                                audio_path = tts_pipeline.combine(audio_paths)
+                            except OSError as e:
+                                print(f"Audio join failed: {e}")
+                    print(f"Audio for {user_id}: {len(audio_paths or [])} chunks ready {(time.perf_counter() - tts_start) * 1000:.0f} ms after the text")
+                    if audio_path:
+                        assistant_message["audio"] = audio_path
+                        assistant_message["audio_format"] = tts_pipeline.audio_format
+                    else:
+                        st.error("Audio generation failed - showing the text response only.")
+
+                # Update chat history with the new query and response
+                st.session_state.chat_history.append({"role": "You", "content": query})
+                st.session_state.chat_history.append(assistant_message)
+                st.session_state.chat_history, st.session_state.chat_offset = trim_window(
+                    st.session_state.chat_history, st.session_state.chat_offset, CHAT_WINDOW_MESSAGES
+                )
+
+                # Queue the interaction for the background writer; it is committed within WRITE_QUEUE_FLUSH_SECONDS
+                try:
+                    with span("history_enqueue"):
+                        write_queue.add_history(user_id, st.session_state.current_session, query, response_text,
+                                                round(result.ttft_ms), round(result.total_ms), prompt_tokens, task)
+                except WriteQueueFull as e:
+                    st.warning(f"Failed to save chat to history: {e}. Proceeding without saving.")
+                    print(f"History write queue error: {e}")
             
-            st.session_state.last_input = query
-            st.session_state.input_value = ""
-            st.rerun()
+                st.session_state.last_input = query
+                st.session_state.input_value = ""
+                st.rerun()
 
-# Close the database connection when the app shuts down
-conn.close()
+# Record the run's duration; st.rerun() and st.stop() also pass through here
+finally:
+    registry.observe("linkedin_phase_duration_seconds", time.perf_counter() - script_start, {"phase": "script_run"})
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from prompts import format_profile_data, format_job_data, job_fit_prompt, prompt_inputs
+
+# Headless job-fit scoring: one profile against a stream of job postings, run concurrently
+# through the same slim prompt as the chat's "job fit" task. Results are appended to a JSONL file
+# as they finish; rerunning with the same output file skips postings already scored.
+
+JOB_FIT_QUERY = "job fit"
+NO_HISTORY = "No previous chat history in this session."
+
+# Match scores are written many ways ("Match score: 82/100", "I'd rate this 75 out of 100", "Score - 90")
+_SCORE_PATTERNS = [
+    re.compile(r'(\d{1,3})\s*(?:/\s*100|out of 100)', re.IGNORECASE),
+    re.compile(r'(?:match|fit)?\s*score\D{0,20}?(\d{1,3})', re.IGNORECASE),
+    re.compile(r'(\d{1,3})\s*%'),
+]
+
+# Pull the 0-100 match score out of a job-fit answer, or None if there isn't one
+def parse_match_score(text):
+    for pattern in _SCORE_PATTERNS:
+        for match in pattern.finditer(text):
+            score = int(match.group(1))
+            if 0 <= score <= 100:
+                return score
+    return None
+
+# Stable id for a posting: its own id field if present, otherwise a hash of its content
+def job_id_for(job):
+    for field in ("id", "job_id"):
+        if job.get(field):
+            return str(job[field])
+    content = {key: value for key, value in job.items() if key != "prerank_score"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+
+# Lazily read postings from a JSONL or CSV file ("-" reads JSONL from stdin)
+def read_jobs(path, fmt=None):
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            for row in csv.DictReader(handle):
+                yield row
+        else:
+            for line_number, line in enumerate(handle, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"Skipping malformed job on line {line_number}: {e}", file=sys.stderr)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+# Ids already scored successfully in a previous (possibly interrupted) run
+def load_checkpoint(output_path):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave one truncated line; that job is simply redone
+                continue
+            if record.get("status") == "ok":
+                done.add(record["job_id"])
+    return done
+
+def load_profile(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# Rank every posting locally and keep only the top k for the LLM, best first.
+# With index_path, the job vectors persist between runs and only unseen postings are featurized.
+def prerank_jobs(jobs, profile, top_k, index_path=None):
+    from job_ranker import JobIndex
+
+    index = JobIndex.load(index_path) if index_path and os.path.exists(index_path) else JobIndex()
+    known = set(index.job_ids)
+    by_id = {}
+    pending = []
+    for job in jobs:
+        job_id = job_id_for(job)
+        by_id[job_id] = job
+        if job_id not in known:
+            known.add(job_id)
+            pending.append((job_id, job))
+            if len(pending) >= 10_000:
+                index.add(pending)
+                pending = []
+    index.add(pending)
+    if index_path:
+        index.save(index_path)
+
+    start = time.perf_counter()
+    profile_text = " ".join(str(profile.get(field) or "") for field in ("about", "experience", "education"))
+    # The persistent index may hold postings that aren't in this input, so over-fetch and filter
+    ranked = [(job_id, score) for job_id, score in index.rank(profile.get("skills") or "", profile_text, k=top_k + len(index) - len(by_id))
+              if job_id in by_id][:top_k]
+    print(f"Pre-ranked {len(by_id)} postings locally in {(time.perf_counter() - start) * 1000:.1f} ms; "
+          f"sending the top {len(ranked)} to the LLM", file=sys.stderr)
+    for job_id, score in ranked:
+        yield {**by_id[job_id], "prerank_score": round(score, 4)}
+
+# Token bucket shared by all workers: at most `rate` request starts per `per` seconds
+class RateLimiter:
+    def __init__(self, rate, per=60.0):
+        self.capacity = max(1, rate)
+        self.tokens = float(self.capacity)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+# Client errors such as a bad request or bad credentials won't succeed on retry
+def is_retryable(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+class BatchRunner:
+    def __init__(self, chain, profile_context, career_goals, limiter, concurrency=8, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, timeout=120.0):
+        self.chain = chain
+        self.profile_context = profile_context
+        self.career_goals = career_goals
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+
+    def inputs_for(self, job):
+        return prompt_inputs(job_fit_prompt, {
+            "query": JOB_FIT_QUERY,
+            "profile_context": self.profile_context,
+            "job_context": format_job_data(job.get("title"), job.get("company"), job.get("skills"), job.get("description")),
+            "career_goals": self.career_goals,
+            "chat_history": NO_HISTORY,
+        })
+
+    # Score one posting with exponential backoff plus jitter between attempts
+    async def score(self, job_id, job):
+        inputs = self.inputs_for(job)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self.chain.ainvoke(inputs), timeout=self.timeout)
+                text = response.content if hasattr(response, 'content') else str(response)
+                return {
+                    "job_id": job_id,
+                    "status": "ok",
+                    "title": job.get("title"),
+                    "company": job.get("company"),
+                    "match_score": parse_match_score(text),
+                    "prerank_score": job.get("prerank_score"),
+                    "response": text,
+                    "attempts": attempt + 1,
+                    "latency_ms": round((time.perf_counter() - start) * 1000),
+                }
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    return {"job_id": job_id, "status": "error", "error": f"{type(e).__name__}: {e}", "attempts": attempt + 1}
+                self.retries += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def run(self, jobs, output_path, done=frozenset()):
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.perf_counter()
+
+        with open(output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    record = await self.score(*item)
+                    # Single-threaded event loop: each line is written whole before another worker resumes
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if record["status"] == "ok":
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                        print(f"Job {record['job_id']} failed: {record['error']}", file=sys.stderr)
+                    if (self.completed + self.failed) % 50 == 0:
+                        elapsed = time.perf_counter() - started
+                        print(f"{self.completed} scored, {self.failed} failed, {self.retries} retries, "
+                              f"{self.completed / max(elapsed, 1e-9):.2f} jobs/s", file=sys.stderr)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            skipped = 0
+            for job in jobs:
+                job_id = job_id_for(job)
+                if job_id in done:
+                    skipped += 1
+                    continue
+                await queue.put((job_id, job))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        elapsed = time.perf_counter() - started
+        print(f"Done: {self.completed} scored, {self.failed} failed, {skipped} already in checkpoint, "
+              f"{self.retries} retries in {elapsed:.1f}s", file=sys.stderr)
+
+def build_chain(model):
+    from langchain_groq import ChatGroq
+
+    # The runner does its own backoff, so the client must not retry underneath it
+    llm = ChatGroq(model=model, temperature=0, api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    return job_fit_prompt | llm
+
+# argparse type for counts and rates that must be at least 1
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Score one LinkedIn profile against many job postings.")
+    parser.add_argument("--profile", required=True, help="JSON file with name, skills, about, experience, education and optional career_goals")
+    parser.add_argument("--jobs", required=True, help="JSONL or CSV file of postings (title, company, skills, description, optional id); '-' for JSONL on stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format when it can't be inferred from the file name")
+    parser.add_argument("--output", required=True, help="JSONL results file; doubles as the resume checkpoint")
+    parser.add_argument("--model", default="llama3-70b-8192")
+    parser.add_argument("--concurrency", type=positive_int, default=8)
+    parser.add_argument("--requests-per-minute", type=positive_int, default=30)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a single request is abandoned and retried")
+    parser.add_argument("--prefilter-top-k", type=int, help="Rank all postings locally first and only send the best K to the LLM")
+    parser.add_argument("--index", help="Persistent .npz job index used with --prefilter-top-k; new postings are added incrementally")
+    args = parser.parse_args(argv)
+
+    profile = load_profile(args.profile)
+    profile_context = format_profile_data(
+        profile.get("name"), profile.get("skills"), profile.get("about"), profile.get("experience"), profile.get("education")
+    )
+    career_goals = profile.get("career_goals") or "No career goals provided."
+    done = load_checkpoint(args.output)
+    if done:
+        print(f"Resuming: {len(done)} postings already scored in {args.output}", file=sys.stderr)
+
+    runner = BatchRunner(
+        build_chain(args.model), profile_context, career_goals,
+        RateLimiter(args.requests_per_minute, per=60.0),
+        concurrency=args.concurrency, max_retries=args.max_retries, timeout=args.timeout
+    )
+    jobs = read_jobs(args.jobs, args.format)
+    if args.prefilter_top_k:
+        jobs = prerank_jobs(jobs, profile, args.prefilter_top_k, args.index)
+    try:
+        asyncio.run(runner.run(jobs, args.output, done))
+    except KeyboardInterrupt:
+        print(f"Interrupted - rerun the same command to resume from {args.output}", file=sys.stderr)
+        return 130
+    return 0 if runner.failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import install_fakes
+from local_postgres import reset_schema, start_local_postgres
+
+# Offline benchmark of the full request path: the real ask.py driven headlessly through Streamlit's AppTest,
+# with a fake LLM, the silent TTS backend and a local PostgreSQL. Results are written as JSON so runs can be
+# compared across commits with --compare.
+
+APP_PATH = os.path.join(ROOT, "ask.py")
+PASSWORD = "benchmark-password"
+
+# Same hashing as ask.hash_password; ask.py itself can't be imported because it runs the page
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def summarize(timings_ms):
+    return {
+        "n": len(timings_ms),
+        "mean_ms": round(statistics.mean(timings_ms), 3),
+        "p50_ms": round(statistics.median(timings_ms), 3),
+        "p95_ms": round(percentile(timings_ms, 0.95), 3),
+        "p99_ms": round(percentile(timings_ms, 0.99), 3),
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Create users with a single session of history_turns turns each, straight through SQL
+def seed(pool, users, history_turns, sessions_per_user=1):
+    from session_index import record_message
+
+    with pool.connection() as conn:
+        with conn.cursor() as c:
+            for u in range(users):
+                user_id = f"user{u}@bench.local"
+                c.execute("INSERT INTO users (user_id, password) VALUES (%s, %s) ON CONFLICT (user_id) DO NOTHING",
+                          (user_id, hash_password(PASSWORD)))
+                for s in range(sessions_per_user):
+                    session_group = f"session_{u}_{s}"
+                    for t in range(history_turns):
+                        query = f"question {t} about my profile and the job"
+                        c.execute("INSERT INTO session_history (user_id, session_group, query, response) VALUES (%s, %s, %s, %s)",
+                                  (user_id, session_group, query, "An answer of moderate length. " * 12))
+                        record_message(c, user_id, session_group, query)
+        conn.commit()
+
+def logged_in_app(user_id):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.text_input(key="login_email").input(user_id)
+    at.text_input(key="login_password").input(PASSWORD)
+    start = time.perf_counter()
+    [b for b in at.button if b.label == "Login"][0].click()
+    at.run()
+    login_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"App raised during login: {at.exception}")
+    return at, login_ms
+
+def load_session(at, session_group):
+    [b for b in at.button if b.key == f"hist_{session_group}"][0].click()
+    at.run()
+
+def ask(at, query):
+    at.text_input(key="chat_input").input(query)
+    [b for b in at.button if b.label == "Ask"][0].click()
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"App raised during chat turn: {at.exception}")
+    return elapsed
+
+# Idle reruns (any widget interaction) and a full chat turn, per history length
+def bench_reruns(pool, history_lengths, reruns):
+    results = {}
+    for turns in history_lengths:
+        reset_pool_schema(pool)
+        seed(pool, 1, turns)
+        at, login_ms = logged_in_app("user0@bench.local")
+        if turns:
+            load_session(at, "session_0_0")
+        timings = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            at.run()
+            timings.append((time.perf_counter() - start) * 1000)
+        # Markdown sent to the browser on each rerun, a proxy for page payload
+        page_kb = sum(len(str(element.value)) for element in at.markdown) / 1024
+        turn_ms = ask(at, "analyze my profile")
+        results[str(turns)] = {"rerun": summarize(timings), "login_ms": round(login_ms, 3), "chat_turn_ms": round(turn_ms, 3),
+                               "markdown_elements": len(at.markdown), "markdown_kb": round(page_kb, 1)}
+        print(f"history {turns:5d} turns: rerun p50 {results[str(turns)]['rerun']['p50_ms']:.1f} ms, chat turn {turn_ms:.1f} ms")
+    return results
+
+# Run fn(worker_index) from `users` threads at once; returns per-call timings and wall time
+def concurrently(users, calls_per_user, fn):
+    timings = []
+    lock = threading.Lock()
+
+    def worker(index):
+        local = []
+        for i in range(calls_per_user):
+            start = time.perf_counter()
+            fn(index, i)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(u,)) for u in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return timings, time.perf_counter() - start
+
+# Login query, sidebar page and chat insert throughput across concurrent users, through the same Repository,
+# SessionListCache and WriteBehindQueue calls ask.py makes
+def bench_db_paths(pool, user_counts, sessions_per_user, calls_per_user):
+    from repository import Repository
+    from session_index import SessionListCache
+    from write_behind import WriteBehindQueue
+
+    results = {}
+    for users in user_counts:
+        reset_pool_schema(pool)
+        seed(pool, users, 2, sessions_per_user)
+        # Wired as in ask.py: committed batches drop the writers' cached sidebar pages
+        repo = Repository(pool)
+        session_list_cache = SessionListCache()
+        queue = WriteBehindQueue(pool, on_flush=lambda user_ids: [session_list_cache.invalidate(u) for u in user_ids])
+
+        def login(u, i):
+            repo.authenticate(f"user{u}@bench.local", hash_password(PASSWORD))
+
+        # Uncached, so every call pays the page query
+        def sidebar(u, i):
+            repo.sessions_page(f"user{u}@bench.local", limit=20)
+
+        def sidebar_cached(u, i):
+            repo.sessions_page(f"user{u}@bench.local", limit=20, session_list_cache=session_list_cache)
+
+        def insert(u, i):
+            queue.add_history(f"user{u}@bench.local", f"session_{u}_0", f"insert {i}", "response text " * 40)
+
+        entry = {}
+        try:
+            for name, fn in (("login_query", login), ("sidebar_query", sidebar), ("sidebar_cached", sidebar_cached)):
+                timings, wall = concurrently(users, calls_per_user, fn)
+                entry[name] = {**summarize(timings), "ops_per_s": round(len(timings) / wall, 1)}
+            # Per-call timings are the enqueue the request pays; throughput counts until the writer has committed everything
+            timings, wall = concurrently(users, calls_per_user, insert)
+            start = time.perf_counter()
+            queue.flush()
+            wall += time.perf_counter() - start
+            entry["chat_insert"] = {**summarize(timings), "ops_per_s": round(len(timings) / wall, 1), "batches": queue.batches}
+        finally:
+            queue.close()
+        results[str(users)] = entry
+        print(f"{users:3d} users: login p50 {entry['login_query']['p50_ms']:.2f} ms, sidebar p50 {entry['sidebar_query']['p50_ms']:.2f} ms "
+              f"({entry['sidebar_cached']['p50_ms']:.3f} ms cached), inserts {entry['chat_insert']['ops_per_s']:.0f}/s")
+    return results
+
+# History manager plus prompt formatting, without the LLM
+def bench_prompt_construction(pool, history_lengths, iterations):
+    from chat_memory import HistoryManager, estimate_tokens
+    from prompts import TASK_PROMPTS, prompt_inputs
+
+    results = {}
+    manager = HistoryManager(lambda summary, turns: (summary + " " + turns[:200]).strip(), recent_turns=6, token_budget=1500)
+    prompt = TASK_PROMPTS["job_fit"]
+    for turns in history_lengths:
+        messages = []
+        for t in range(turns):
+            messages.append({"role": "You", "content": f"question {t}"})
+            messages.append({"role": "Assistant", "content": "An answer of moderate length. " * 12})
+        timings = []
+        tokens = 0
+        for i in range(iterations):
+            state = {}
+            start = time.perf_counter()
+            history, _ = manager.build(pool.connection, "prompt@bench.local", f"prompt_{turns}_{i}", messages, state)
+            text = prompt.format(**prompt_inputs(prompt, {
+                "query": "job fit", "profile_context": "Skills: Python", "job_context": "Job Title: Engineer",
+                "career_goals": "", "chat_history": history,
+            }))
+            timings.append((time.perf_counter() - start) * 1000)
+            tokens = estimate_tokens(text)
+        results[str(turns)] = {**summarize(timings), "prompt_tokens": tokens}
+    return results
+
+def reset_pool_schema(pool):
+    from migrations import run_migrations
+    from write_behind import close_all
+
+    # Drain the app's background writer before its tables are dropped
+    close_all()
+    with pool.connection() as conn:
+        reset_schema(conn)
+        run_migrations(conn)
+    # Process-wide caches would otherwise serve pages from the previous seed
+    import streamlit as st
+    st.cache_resource.clear()
+
+# Print relative change of every shared numeric leaf between two result files
+def compare(old, new, path=""):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key in new and key != "meta":
+                compare(old[key], new[key], f"{path}.{key}" if path else key)
+    elif isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+        change = 100 * (new - old) / old
+        flag = "  <-- regression" if path.endswith("_ms") and change > 10 else ""
+        print(f"{path:70s} {old:12.3f} -> {new:12.3f} ({change:+6.1f}%){flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the chat app's request path.")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    parser.add_argument("--use-env", action="store_true", help="Use PG_* from the environment instead of starting pgserver")
+    parser.add_argument("--history-lengths", default="0,20,100,400")
+    parser.add_argument("--user-counts", default="1,4,16")
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--calls-per-user", type=int, default=50)
+    parser.add_argument("--sessions-per-user", type=int, default=200)
+    parser.add_argument("--llm-first-token-ms", type=float, default=50)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=2000)
+    args = parser.parse_args()
+
+    server = None if args.use_env else start_local_postgres()
+    install_fakes(first_token_latency=args.llm_first_token_ms / 1000, tokens_per_second=args.llm_tokens_per_second)
+
+    from db import ConnectionPool
+
+    history_lengths = [int(x) for x in args.history_lengths.split(",")]
+    user_counts = [int(x) for x in args.user_counts.split(",")]
+    pool = ConnectionPool(max_size=max(user_counts) + 2)
+    try:
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "args": vars(args),
+            },
+            "reruns_by_history_turns": bench_reruns(pool, history_lengths, args.reruns),
+            "db_paths_by_users": bench_db_paths(pool, user_counts, args.sessions_per_user, args.calls_per_user),
+            "prompt_construction_by_history_turns": bench_prompt_construction(pool, history_lengths, args.reruns),
+        }
+    finally:
+        pool.close()
+        if server is not None:
+            server.cleanup()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from dotenv import load_dotenv
+from db import ConnectionPool, connect_from_env
+
+# Compare the database cost of one Streamlit rerun before and after pooling:
+# "connect" opens a fresh SSL connection, runs the login query and closes it (the old init_db/conn.close() path),
+# "pooled" checks a warm connection out of the pool, runs the same query and returns it.
+# With --local the database is a throwaway pgserver on a unix socket, which has no TLS handshake or network
+# round trip, so the saving it shows is a lower bound for a remote Neon database.
+
+QUERY = "SELECT profile_data, job_data, career_goals FROM users WHERE user_id=%s AND password=%s"
+
+def run_connect(iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        conn = connect_from_env()
+        c = conn.cursor()
+        c.execute(QUERY, ("bench@example.com", "x"))
+        c.fetchone()
+        conn.close()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def run_pooled(iterations):
+    pool = ConnectionPool(max_size=2)
+    timings = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            conn = pool.getconn()
+            c = conn.cursor()
+            c.execute(QUERY, ("bench@example.com", "x"))
+            c.fetchone()
+            c.close()
+            pool.putconn(conn)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        pool.close()
+    return timings
+
+def summarize(name, timings):
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"{name:>8}: mean {statistics.mean(timings):8.2f} ms | p50 {statistics.median(timings):8.2f} ms | p95 {p95:8.2f} ms")
+    return statistics.mean(timings)
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Measure per-rerun database latency with and without the connection pool.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--local", action="store_true", help="Start a throwaway local pgserver instead of using PG_* from .env")
+    args = parser.parse_args()
+
+    server = None
+    if args.local:
+        from local_postgres import start_local_postgres
+        from migrations import run_migrations
+
+        server = start_local_postgres()
+        conn = connect_from_env()
+        run_migrations(conn)
+        conn.close()
+    try:
+        connect_mean = summarize("connect", run_connect(args.iterations))
+        pooled_mean = summarize("pooled", run_pooled(args.iterations))
+        print(f"Saved per rerun: {connect_mean - pooled_mean:.2f} ms ({connect_mean / max(pooled_mean, 1e-9):.1f}x faster)")
+    finally:
+        if server is not None:
+            server.cleanup()
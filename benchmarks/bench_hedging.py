@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_app import concurrently, summarize
+from bench_prompt_tokens import sample_inputs
+from fakes import FakeChatModel
+from llm_executor import AllBackendsFailed, Backend, CircuitBreaker, DeadlineExceeded, HedgedChatModel, HedgedExecutor
+from prompts import unified_prompt
+from streaming import stream_chain
+
+# Tail latency and availability of the hedged LLM layer against offline stand-in backends with injected
+# slow calls and failures. Requests go through unified_prompt | HedgedChatModel and stream_chain, as in the app.
+
+def fake(args, **overrides):
+    settings = {"first_token_latency": args.first_token_ms / 1000, "tokens_per_second": 2000, "response_tokens": 40,
+                "slow_rate": args.slow_rate, "slow_latency": args.slow_ms / 1000}
+    settings.update(overrides)
+    return FakeChatModel(**settings)
+
+def run(executor, users, calls_per_user):
+    chain = unified_prompt | HedgedChatModel(executor=executor)
+    outcomes = {"ok": 0, "deadline": 0, "failed": 0}
+    ttft = []
+
+    def call(u, i):
+        try:
+            result = stream_chain(chain, sample_inputs(f"question {u} {i} about my profile"))
+            ttft.append(result.ttft_ms)
+            outcomes["ok"] += 1
+        except DeadlineExceeded:
+            outcomes["deadline"] += 1
+        except AllBackendsFailed:
+            outcomes["failed"] += 1
+
+    timings, _ = concurrently(users, calls_per_user, call)
+    return {"total": summarize(timings), "ttft": summarize(ttft) if ttft else None, **outcomes, "backends": executor.stats()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM execution against fake backends.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--first-token-ms", type=float, default=50)
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Fraction of calls with a slow first token")
+    parser.add_argument("--slow-ms", type=float, default=1500)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    calls_per_user = args.requests // args.users
+    options = {"default_hedge_delay": 0.2, "min_samples": 20, "deadline": 10.0}
+
+    scenarios = {
+        "single_backend_no_hedge": lambda: HedgedExecutor([Backend("primary", fake(args))], hedge=False, **options),
+        "hedged_two_backends": lambda: HedgedExecutor([Backend("primary", fake(args)), Backend("secondary", fake(args))], **options),
+        "hedged_same_backend": lambda: HedgedExecutor([Backend("primary", fake(args))], **options),
+        # Primary always fails: its breaker should open and traffic should move to the secondary
+        "failing_primary": lambda: HedgedExecutor([
+            Backend("primary", fake(args, fail_rate=1.0), CircuitBreaker(failure_threshold=3, reset_timeout=5)),
+            Backend("secondary", fake(args)),
+        ], **options),
+        # Every call is slower than the deadline
+        "deadline": lambda: HedgedExecutor([Backend("primary", fake(args, slow_rate=1.0, slow_latency=2.0))],
+                                           hedge=False, default_hedge_delay=0.2, deadline=0.5),
+    }
+    results = {}
+    for name, make in scenarios.items():
+        results[name] = run(make(), args.users, calls_per_user)
+        r = results[name]
+        line = f"{name:26s} ok {r['ok']:4d} deadline {r['deadline']:3d} failed {r['failed']:3d}"
+        if r["ttft"]:
+            line += f" | ttft p50 {r['ttft']['p50_ms']:7.1f} p95 {r['ttft']['p95_ms']:7.1f} p99 {r['ttft']['p99_ms']:7.1f} ms"
+        print(line)
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+
+# Per-call cost of the metrics layer: a bare loop vs a span, counter and histogram, single and multi-threaded
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def threaded_per_call_us(fn, iterations, threads):
+    def worker():
+        for _ in range(iterations):
+            fn()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return (time.perf_counter() - start) / (iterations * threads) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of metrics spans and counters.")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--series", type=int, default=50, help="Distinct label sets already registered")
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    for i in range(args.series):
+        registry.observe("bench_seconds", 0.01, {"phase": f"phase_{i}"})
+
+    def empty():
+        pass
+
+    def timed_span():
+        with registry.span("bench", task="job_fit"):
+            pass
+
+    def counter():
+        registry.inc("bench_total", {"task": "job_fit"})
+
+    def histogram():
+        registry.observe("bench_seconds", 0.01, {"phase": "phase_0"})
+
+    results = {name: round(per_call_us(fn, args.iterations), 3)
+               for name, fn in (("empty_us", empty), ("span_us", timed_span), ("counter_us", counter), ("histogram_us", histogram))}
+    results[f"span_us_{args.threads}_threads"] = round(threaded_per_call_us(timed_span, args.iterations // args.threads, args.threads), 3)
+    start = time.perf_counter()
+    text = registry.render_prometheus()
+    results["render_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    results["render_lines"] = text.count("\n")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
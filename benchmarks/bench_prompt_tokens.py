@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import estimate_tokens
+from intent_router import IntentRouter, PREVIOUS_QUESTION
+from prompts import TASK_PROMPTS, format_job_data, format_profile_data, prompt_inputs, unified_prompt
+
+# Input tokens per routed task compared with sending everything through unified_prompt
+
+SAMPLE_QUERIES = {
+    "profile_analysis": "analyze my profile",
+    "job_fit": "job fit",
+    "content_enhancement": "improve profile",
+    "career_guidance": "career guidance please",
+    "cover_letter": "write a cover letter",
+    "previous_question": "what was my last question",
+    "general": "what can you do",
+}
+
+def sample_inputs(query):
+    return {
+        "query": query,
+        "profile_context": format_profile_data(
+            "Prasad Gavhane", "Python, Generative AI", "Experienced software engineer with a focus on AI and data analytics.",
+            "Senior Software Engineer at LTIMindtree (2020-Present): Worked on Generative AI projects.\n"
+            "Software Engineer at XYZ Corp (2018-2020): Developed Python-based applications.",
+            "B.Tech from IIT(ISM) Dhanbad (2014-2018)"
+        ),
+        "job_context": format_job_data(
+            "Senior Software Engineer", "TechCorp", "Python, Generative AI, Software Development",
+            "Seeking a Senior Software Engineer with expertise in Python, Generative AI, and software development."
+        ),
+        "career_goals": "Move into an ML platform lead role within two years.",
+        "chat_history": "You: analyze my profile\nAssistant: Your profile is strong on Python and generative AI work.",
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report prompt token reduction per routed task.")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    router = IntentRouter()
+    results = {}
+    for expected, query in SAMPLE_QUERIES.items():
+        start = time.perf_counter()
+        task, confidence, method = router.route(query)
+        route_us = (time.perf_counter() - start) * 1e6
+        inputs = sample_inputs(query)
+        unified_tokens = estimate_tokens(unified_prompt.format(**inputs))
+        if task == PREVIOUS_QUESTION:
+            task_tokens = 0
+        else:
+            prompt = TASK_PROMPTS[task]
+            task_tokens = estimate_tokens(prompt.format(**prompt_inputs(prompt, inputs)))
+        results[expected] = {
+            "routed_to": task,
+            "method": method,
+            "route_us": round(route_us, 1),
+            "unified_tokens": unified_tokens,
+            "task_tokens": task_tokens,
+            "reduction_pct": round(100 * (1 - task_tokens / unified_tokens), 1),
+        }
+        print(f"{expected:>20} -> {task:<20} {unified_tokens:5d} -> {task_tokens:5d} tokens ({results[expected]['reduction_pct']:5.1f}% fewer), routed in {route_us:.0f} us")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
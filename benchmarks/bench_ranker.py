@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_ranker import JobIndex, job_features
+
+# Throughput and memory of the local job pre-ranker on synthetic postings
+
+SKILLS = [
+    "python", "java", "javascript", "typescript", "go", "rust", "c++", "sql", "postgresql", "aws", "gcp", "azure",
+    "docker", "kubernetes", "terraform", "react", "node.js", "django", "flask", "fastapi", "spark", "airflow",
+    "machine learning", "deep learning", "generative ai", "nlp", "computer vision", "pytorch", "tensorflow",
+    "data analytics", "tableau", "power bi", "excel", "product management", "agile", "scrum", "figma", "ux research",
+    "sales", "marketing", "seo", "content writing", "finance", "accounting", "recruiting", "customer success",
+]
+WORDS = ("build scale design lead own ship collaborate mentor improve platform service pipeline model customer "
+         "team product data infrastructure reliability growth experiment analysis strategy roadmap stakeholder "
+         "backend frontend distributed realtime api cloud security compliance payments search ranking").split()
+TITLES = ["Software Engineer", "Senior Software Engineer", "Data Scientist", "ML Engineer", "Product Manager",
+          "Data Analyst", "DevOps Engineer", "Frontend Developer", "Backend Developer", "Engineering Manager"]
+
+def synthetic_job(rng, i):
+    skills = rng.sample(SKILLS, rng.randint(3, 8))
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + " " + " ".join(skills)
+    return f"job-{i}", {"title": rng.choice(TITLES), "skills": ", ".join(skills), "description": description}
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the local job pre-ranking index.")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=10_000, help="Postings per add() call, to exercise incremental updates")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    jobs = [synthetic_job(rng, i) for i in range(args.jobs)]
+
+    start = time.perf_counter()
+    featurized = [(job_id, job_features(job)) for job_id, job in jobs]
+    featurize_s = time.perf_counter() - start
+
+    tracemalloc.start()
+    index = JobIndex()
+    start = time.perf_counter()
+    for i in range(0, len(featurized), args.batch):
+        index.add(featurized[i:i + args.batch], featurized=True)
+    add_s = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    profile_skills = "Python, Generative AI, machine learning, SQL, AWS"
+    profile_text = "Senior Software Engineer experienced in Python applications, data pipelines and generative ai platform work"
+    start = time.perf_counter()
+    index.rank(profile_skills, profile_text, k=args.top_k)
+    first_query_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for _ in range(args.queries):
+        skills = ", ".join(rng.sample(SKILLS, 5))
+        start = time.perf_counter()
+        index.rank(skills, profile_text, k=args.top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        start = time.perf_counter()
+        JobIndex.load(path).rank(profile_skills, profile_text, k=args.top_k)
+        load_s = time.perf_counter() - start
+
+    results = {
+        "jobs": len(index),
+        "featurize_jobs_per_s": round(args.jobs / featurize_s),
+        "index_add_jobs_per_s": round(args.jobs / add_s),
+        "index_mb": round(index.nbytes / 1e6, 1),
+        "index_build_peak_mb": round(peak_bytes / 1e6, 1),
+        "first_query_ms": round(first_query_ms, 2),
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p95_ms": round(percentile(latencies, 0.95), 2),
+        "queries_per_s": round(1000 / statistics.mean(latencies), 1),
+        "save_s": round(save_s, 3),
+        "file_mb": round(size_mb, 1),
+        "load_and_first_query_s": round(load_s, 3),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
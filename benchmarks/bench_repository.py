@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_app import PASSWORD, concurrently, hash_password, reset_pool_schema, seed, summarize
+from local_postgres import start_local_postgres
+
+# Load test of the data-access layer: simulated chat turns (login check, sidebar page, LLM wait, history insert)
+# from N concurrent sessions against a fixed-size pool. "per_run" holds one connection for the whole script run,
+# as ask.py did before the repository; "per_request" borrows one per statement group through Repository.
+
+def turn_per_run(pool, llm_seconds):
+    from session_index import fetch_sessions_page, record_message
+
+    def turn(u, i):
+        user_id = f"user{u}@bench.local"
+        conn = pool.getconn(timeout=60)
+        try:
+            c = conn.cursor()
+            c.execute("SELECT profile_data, job_data, career_goals FROM users WHERE user_id=%s AND password=%s", (user_id, hash_password(PASSWORD)))
+            c.fetchone()
+            fetch_sessions_page(c, user_id, limit=20)
+            time.sleep(llm_seconds)
+            c.execute("INSERT INTO session_history (user_id, session_group, query, response) VALUES (%s, %s, %s, %s)",
+                      (user_id, f"session_{u}_0", f"turn {i}", "response text " * 40))
+            record_message(c, user_id, f"session_{u}_0", f"turn {i}")
+            conn.commit()
+            c.close()
+        finally:
+            pool.putconn(conn)
+    return turn
+
+def turn_per_request(pool, llm_seconds):
+    from repository import Repository
+
+    repo = Repository(pool)
+
+    def turn(u, i):
+        user_id = f"user{u}@bench.local"
+        repo.authenticate(user_id, hash_password(PASSWORD))
+        repo.sessions_page(user_id, limit=20)
+        time.sleep(llm_seconds)
+        repo.insert_turn(user_id, f"session_{u}_0", f"turn {i}", "response text " * 40)
+    return turn
+
+def check_counts(pool, users, turns_per_user):
+    with pool.connection() as conn, conn.cursor() as c:
+        c.execute("SELECT COUNT(*) FROM session_history WHERE query LIKE 'turn %%'")
+        inserted = c.fetchone()[0]
+        c.execute("SELECT COALESCE(SUM(message_count), 0) FROM sessions")
+        counted = c.fetchone()[0]
+    expected = users * turns_per_user
+    # seed() writes 2 turns per user before the run
+    return inserted == expected and counted == expected + 2 * users
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test per-run vs per-request database access.")
+    parser.add_argument("--use-env", action="store_true", help="Use PG_* from the environment instead of starting pgserver")
+    parser.add_argument("--user-counts", default="1,4,16,64")
+    parser.add_argument("--turns-per-user", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--llm-ms", type=float, default=50, help="Simulated generation time per turn")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    server = None if args.use_env else start_local_postgres()
+    from db import ConnectionPool
+
+    pool = ConnectionPool(max_size=args.pool_size, checkout_timeout=120)
+    results = {}
+    try:
+        for users in [int(x) for x in args.user_counts.split(",")]:
+            entry = {}
+            for name, make_turn in (("per_run", turn_per_run), ("per_request", turn_per_request)):
+                reset_pool_schema(pool)
+                seed(pool, users, 2)
+                timings, wall = concurrently(users, args.turns_per_user, make_turn(pool, args.llm_ms / 1000))
+                entry[name] = {**summarize(timings), "turns_per_s": round(len(timings) / wall, 1),
+                               "consistent": check_counts(pool, users, args.turns_per_user)}
+            results[str(users)] = entry
+            print(f"{users:3d} users: per-run {entry['per_run']['turns_per_s']:7.1f} turns/s (p99 {entry['per_run']['p99_ms']:.0f} ms) | "
+                  f"per-request {entry['per_request']['turns_per_s']:7.1f} turns/s (p99 {entry['per_request']['p99_ms']:.0f} ms)")
+    finally:
+        pool.close()
+        if server is not None:
+            server.cleanup()
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
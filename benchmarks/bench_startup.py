@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# Cold-start cost of the app: import time of each dependency and the time for a fresh process to paint the
+# login page, plus which LLM/TTS modules were loaded by then. Every sample runs in a new interpreter.
+
+APP_PATH = os.path.join(ROOT, "ask.py")
+IMPORTS = ["streamlit", "psycopg2", "dotenv", "langchain.prompts", "langchain_core.runnables", "langchain_groq", "groq", "gtts",
+           "db", "migrations", "metrics", "write_behind", "intent_router", "prompts", "tts"]
+# Nothing under these packages should be imported before the first question is asked
+DEFERRED = ("langchain", "langchain_core", "langchain_groq", "groq", "gtts", "tts", "prompts")
+
+def import_seconds(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(out.stdout.strip()) if out.returncode == 0 else None
+
+# Runs inside a fresh interpreter: paint the login page, then log in and ask one question
+def child():
+    process_start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_ready = time.perf_counter()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    painted = time.perf_counter()
+    if at.exception:
+        raise SystemExit(f"App raised on first paint: {at.exception}")
+    loaded = sorted({name.split(".")[0] for name in sys.modules if name.split(".")[0] in DEFERRED})
+
+    # The LLM is only needed now, so the fakes can be installed without skewing the first paint
+    from fakes import install_fakes
+    install_fakes(first_token_latency=0.01, tokens_per_second=5000)
+    at.text_input(key="signup_email").input(f"startup{os.getpid()}@bench.local")
+    at.text_input(key="signup_password").input("benchmark-password")
+    [b for b in at.button if b.label == "Sign Up"][0].click()
+    at.run()
+    at.text_input(key="chat_input").input("analyze my profile")
+    [b for b in at.button if b.label == "Ask"][0].click()
+    start = time.perf_counter()
+    at.run()
+    first_turn = time.perf_counter() - start
+    if at.exception:
+        raise SystemExit(f"App raised on first question: {at.exception}")
+    print(json.dumps({
+        "streamlit_import_ms": (streamlit_ready - process_start) * 1000,
+        "first_paint_ms": (painted - streamlit_ready) * 1000,
+        "deferred_modules_loaded_at_first_paint": loaded,
+        "first_question_ms": first_turn * 1000,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and first paint of the app.")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--use-env", action="store_true", help="Use PG_* from the environment instead of starting pgserver")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    imports = {}
+    for module in IMPORTS:
+        samples = [import_seconds(module) for _ in range(args.samples)]
+        imports[module] = None if None in samples else round(min(samples) * 1000, 1)
+        print(f"import {module:28s} {imports[module]} ms")
+
+    from local_postgres import start_local_postgres
+    server = None if args.use_env else start_local_postgres()
+    runs = []
+    try:
+        for _ in range(args.samples):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=ROOT, capture_output=True, text=True,
+                                 env={**os.environ, "TTS_BACKEND": "silent"})
+            if out.returncode != 0:
+                raise SystemExit(out.stderr[-2000:])
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    finally:
+        if server is not None:
+            server.cleanup()
+
+    results = {
+        "import_ms": imports,
+        "streamlit_import_ms": round(statistics.median(r["streamlit_import_ms"] for r in runs), 1),
+        "first_paint_ms": round(statistics.median(r["first_paint_ms"] for r in runs), 1),
+        "first_question_ms": round(statistics.median(r["first_question_ms"] for r in runs), 1),
+        "deferred_modules_loaded_at_first_paint": runs[-1]["deferred_modules_loaded_at_first_paint"],
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_app import concurrently, reset_pool_schema, summarize
+from local_postgres import start_local_postgres
+
+# Chat-history writes done inline (INSERT + sessions upsert + commit per turn, as before the write-behind queue)
+# vs queued on WriteBehindQueue: caller-side latency per turn and end-to-end ingest rate until rows are committed
+
+RESPONSE = "An answer of moderate length. " * 12
+
+def bench_inline(pool, users, calls_per_user):
+    from session_index import record_message
+
+    def write(u, i):
+        with pool.connection() as conn, conn.cursor() as c:
+            c.execute("INSERT INTO session_history (user_id, session_group, query, response) VALUES (%s, %s, %s, %s)",
+                      (f"user{u}@bench.local", f"session_{u}", f"question {i}", RESPONSE))
+            record_message(c, f"user{u}@bench.local", f"session_{u}", f"question {i}")
+            conn.commit()
+
+    timings, wall = concurrently(users, calls_per_user, write)
+    return {**summarize(timings), "rows_per_s": round(len(timings) / wall, 1)}
+
+def bench_queued(pool, users, calls_per_user, batch_size, flush_interval):
+    from write_behind import WriteBehindQueue
+
+    queue = WriteBehindQueue(pool, batch_size=batch_size, flush_interval=flush_interval)
+
+    def write(u, i):
+        queue.add_history(f"user{u}@bench.local", f"session_{u}", f"question {i}", RESPONSE)
+
+    start = time.perf_counter()
+    timings, _ = concurrently(users, calls_per_user, write)
+    queue.close()
+    wall = time.perf_counter() - start
+    stats = queue.stats()
+    return {**summarize(timings), "rows_per_s": round(stats["written"] / wall, 1), "batches": stats["batches"]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inline vs write-behind chat history writes.")
+    parser.add_argument("--use-env", action="store_true", help="Use PG_* from the environment instead of starting pgserver")
+    parser.add_argument("--user-counts", default="1,4,16")
+    parser.add_argument("--calls-per-user", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    server = None if args.use_env else start_local_postgres()
+    from db import ConnectionPool
+
+    user_counts = [int(x) for x in args.user_counts.split(",")]
+    pool = ConnectionPool(max_size=max(user_counts) + 2)
+    results = {}
+    try:
+        for users in user_counts:
+            reset_pool_schema(pool)
+            inline = bench_inline(pool, users, args.calls_per_user)
+            reset_pool_schema(pool)
+            queued = bench_queued(pool, users, args.calls_per_user, args.batch_size, args.flush_interval)
+            results[str(users)] = {"inline": inline, "write_behind": queued}
+            print(f"{users:3d} users: inline p99 {inline['p99_ms']:.2f} ms, {inline['rows_per_s']:.0f} rows/s | "
+                  f"write-behind p99 {queued['p99_ms']:.3f} ms, {queued['rows_per_s']:.0f} rows/s in {queued['batches']} batches")
+    finally:
+        pool.close()
+        if server is not None:
+            server.cleanup()
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
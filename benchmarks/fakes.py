@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from tts import SilentBackend
+
+# Offline stand-ins for the app's external services, used by the benchmark suite
+
+_WORDS = ("profile experience skills python generative ai role match score recommend improve headline summary "
+          "impact projects leadership results team growth learning certification cover letter company").split()
+
+# Deterministic chat model with configurable time to first token and token rate.
+# The answer depends only on the prompt, so repeated runs produce identical output.
+class FakeChatModel(BaseChatModel):
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 200.0
+    response_tokens: int = 120
+    fail_rate: float = 0.0
+    # Fraction of calls whose first token takes slow_latency instead, to model a long-tailed upstream
+    slow_rate: float = 0.0
+    slow_latency: float = 2.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _tokens(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(prompt.encode()).digest()
+        tokens = [_WORDS[digest[i % len(digest)] % len(_WORDS)] for i in range(self.response_tokens)]
+        # Give job-fit style prompts something parseable
+        return [f"Match score: {digest[0] % 101}/100."] + [" " + token for token in tokens] + ["."]
+
+    def _check_failure(self, messages):
+        self.calls += 1
+        if self.fail_rate and (self.calls * 0.6180339887) % 1.0 < self.fail_rate:
+            raise RuntimeError("Injected fake LLM failure")
+
+    def _first_token_latency(self):
+        if self.slow_rate and (self.calls * 0.4142135624) % 1.0 < self.slow_rate:
+            return self.slow_latency
+        return self.first_token_latency
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_failure(messages)
+        tokens = self._tokens(messages)
+        time.sleep(self._first_token_latency() + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_failure(messages)
+        time.sleep(self._first_token_latency())
+        for token in self._tokens(messages):
+            time.sleep(1.0 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_failure(messages)
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self._first_token_latency() + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_failure(messages)
+        await asyncio.sleep(self._first_token_latency())
+        for token in self._tokens(messages):
+            await asyncio.sleep(1.0 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+# Drop-in for langchain_groq.ChatGroq: accepts its constructor arguments and ignores the API key
+def fake_chat_groq_factory(first_token_latency=0.2, tokens_per_second=200.0, response_tokens=120):
+    def FakeChatGroq(model=None, temperature=0, api_key=None, **kwargs):
+        return FakeChatModel(first_token_latency=first_token_latency, tokens_per_second=tokens_per_second,
+                             response_tokens=response_tokens)
+    return FakeChatGroq
+
+# Route the app's LLM and TTS to the fakes; call before the app script runs
+def install_fakes(first_token_latency=0.2, tokens_per_second=200.0, response_tokens=120):
+    import langchain_groq
+
+    langchain_groq.ChatGroq = fake_chat_groq_factory(first_token_latency, tokens_per_second, response_tokens)
+    os.environ["TTS_BACKEND"] = "silent"
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+# Silent synthesizer with a fixed per-chunk delay standing in for gTTS network time
+def FakeTTSBackend(delay_seconds=0.05):
+    return SilentBackend(delay_seconds=delay_seconds)
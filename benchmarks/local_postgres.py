@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+# Point the app's PG_* settings at a throwaway local PostgreSQL.
+# Uses the optional `pgserver` package (pip install pgserver), which bundles the server binaries;
+# without it, export PG_HOST/PG_PORT/PG_USER/PG_PASSWORD/PG_DATABASE for an existing local server
+# and pass --use-env to the benchmark.
+
+def start_local_postgres(data_dir=None):
+    try:
+        import pgserver
+    except ImportError:
+        raise SystemExit("Install pgserver (pip install pgserver) or run with --use-env against a local PostgreSQL.")
+
+    data_dir = data_dir or tempfile.mkdtemp(prefix="linkedin-bench-pg-")
+    server = pgserver.get_server(data_dir, cleanup_mode="stop")
+    server.psql("CREATE DATABASE linkedin;")
+    # pgserver listens on a unix socket; libpq accepts the socket directory as the host
+    socket_dir = server.get_uri().split("host=")[-1]
+    os.environ.update({
+        "PG_HOST": socket_dir,
+        "PG_PORT": "5432",
+        "PG_USER": "postgres",
+        "PG_PASSWORD": "",
+        "PG_DATABASE": "linkedin",
+        "PG_SSLMODE": "disable",
+    })
+    return server
+
+# Drop every app table so each benchmark run starts from an empty, freshly migrated schema
+def reset_schema(conn):
+    with conn.cursor() as c:
+        c.execute("DROP SCHEMA public CASCADE")
+        c.execute("CREATE SCHEMA public")
+    conn.commit()
@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from chat_window import load_older
+from db import PoolExhausted
+
+NO_HISTORY = "No previous chat history in this session."
+
+# Rough token estimate (~4 characters per token for English text); good enough for budgeting
+# without pulling in the model's tokenizer
+def estimate_tokens(text):
+    return (len(text) + 3) // 4 if text else 0
+
+def format_turns(messages):
+    return "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+
+# Keeps the prompt's chat history inside a token budget: the most recent turns go in verbatim,
+# everything older is folded into a rolling summary stored per session_group.
+# The summary only ever absorbs the turns that fell out of the window, so it is never rebuilt from scratch.
+# Folding waits until fold_turns turns have expired (or the prompt is over budget) and runs on a background
+# worker, so a request never waits on the summary LLM call; until a fold lands, expired turns stay verbatim.
+class HistoryManager:
+    def __init__(self, summarize, recent_turns=6, token_budget=1500, fold_turns=4, max_fold_turns=20, max_workers=2):
+        # summarize(previous_summary, new_turns_text) -> updated summary text
+        self.summarize = summarize
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.fold_turns = fold_turns
+        # Largest number of turns sent to one summarize call when catching up on a reloaded session
+        self.max_fold_turns = max_fold_turns
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary")
+        # Guards the session_state dicts shared between a session's script thread and the fold worker
+        self._lock = threading.Lock()
+
+    # connection() returns a context manager yielding a connection, e.g. ConnectionPool.connection, so none is
+    # held while the summarize call is waiting on the LLM
+    def load_summary(self, connection, user_id, session_group):
+        try:
+            with connection() as conn:
+                try:
+                    with conn.cursor() as c:
+                        c.execute("SELECT summary, summarized_messages FROM session_summaries WHERE user_id=%s AND session_group=%s",
+                                  (user_id, session_group))
+                        row = c.fetchone()
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    raise
+        except (psycopg2.Error, PoolExhausted) as e:
+            print(f"Failed to load session summary: {e}")
+            row = None
+        return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, connection, user_id, session_group, summary, summarized_messages):
+        try:
+            with connection() as conn:
+                try:
+                    with conn.cursor() as c:
+                        c.execute("""
+                            INSERT INTO session_summaries (user_id, session_group, summary, summarized_messages, updated_at)
+                            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+                            ON CONFLICT (user_id, session_group) DO UPDATE
+                            SET summary = EXCLUDED.summary, summarized_messages = EXCLUDED.summarized_messages, updated_at = CURRENT_TIMESTAMP
+                        """, (user_id, session_group, summary, summarized_messages))
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    raise
+        except (psycopg2.Error, PoolExhausted) as e:
+            print(f"Failed to save session summary: {e}")
+
+    # Return (expired messages still in memory, verbatim window, index where the window starts) given how many were summarized before.
+    # messages may be the tail of the session, starting at absolute position offset; indexes are absolute.
+    def _partition(self, messages, summarized_messages, offset=0):
+        window = self.recent_turns * 2
+        # A turn is a You/Assistant pair; never start the window in the middle of one
+        cutoff = max(0, offset + len(messages) - window)
+        cutoff -= cutoff % 2
+        cutoff = max(cutoff, offset)
+        start = max(min(summarized_messages, cutoff), offset)
+        return messages[start - offset:cutoff - offset], messages[cutoff - offset:], cutoff
+
+    # Build the chat_history prompt variable from the stored summary, any expired turns still waiting to be folded,
+    # and the verbatim window; schedules a background fold once enough turns have expired.
+    # state is a dict kept in session_state: {"session_group", "summary", "summarized_messages"}.
+    # offset is how many earlier messages of the session are not in `messages`. Returns (chat_history_str, stats).
+    def build(self, connection, user_id, session_group, messages, state, offset=0):
+        if state.get("session_group") != session_group:
+            summary, summarized = self.load_summary(connection, user_id, session_group)
+            with self._lock:
+                state.clear()
+                state.update({"session_group": session_group, "summary": summary, "summarized_messages": summarized})
+
+        with self._lock:
+            summary, summarized = state["summary"], state["summarized_messages"]
+            folding = state.get("folding", False)
+        expired, window, cutoff = self._partition(messages, summarized, offset)
+
+        # Expired turns are not in the summary yet, so they go in verbatim ahead of the window
+        verbatim = expired + window
+        over_budget = estimate_tokens(format_turns(verbatim)) + estimate_tokens(summary) > self.token_budget
+        # Turns between the stored summary and a reloaded window exist only in session_history
+        gap = max(0, offset - summarized)
+        scheduled = 0
+        if (expired or gap) and not folding and (gap or len(expired) >= 2 * self.fold_turns or over_budget):
+            with self._lock:
+                state["folding"] = True
+            scheduled = gap + len(expired)
+            self.executor.submit(self._fold, connection, user_id, session_group, list(messages), gap, list(expired),
+                                 summary, summarized, cutoff, state)
+
+        # If still over budget, drop the oldest turns from this prompt; they reach the summary when the fold lands
+        while len(verbatim) > 2 and estimate_tokens(format_turns(verbatim)) + estimate_tokens(summary) > self.token_budget:
+            verbatim = verbatim[2:]
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if verbatim:
+            parts.append(format_turns(verbatim))
+        history = "\n".join(parts) if parts else NO_HISTORY
+        stats = {
+            "history_tokens": estimate_tokens(history),
+            "verbatim_messages": len(verbatim),
+            "summarized_messages": summarized,
+            "folding_messages": scheduled,
+        }
+        return history, stats
+
+    # Runs on the worker: fetch any turns missing between the summary and the window, fold them and the expired turns
+    # into the summary, storing and publishing it after each batch so the counter never passes unsummarized turns
+    def _fold(self, connection, user_id, session_group, messages, gap, expired, summary, summarized, cutoff, state):
+        try:
+            batches = []
+            if gap:
+                with connection() as conn:
+                    with conn.cursor() as c:
+                        missing = load_older(c, user_id, session_group, messages, gap // 2)
+                # The gap ends where the window starts, whatever the rows fetched
+                step = 2 * self.max_fold_turns
+                for i in range(0, len(missing), step):
+                    end = summarized + gap if i + step >= len(missing) else summarized + i + step
+                    batches.append((missing[i:i + step], end))
+            if expired:
+                batches.append((expired, cutoff))
+            for turns, position in batches:
+                summary = self.summarize(summary, format_turns(turns))
+                self.save_summary(connection, user_id, session_group, summary, position)
+                with self._lock:
+                    if state.get("session_group") == session_group:
+                        state["summary"] = summary
+                        state["summarized_messages"] = position
+        except Exception as e:
+            # Keep the summary as of the last stored batch; the remaining turns are retried on the next request
+            print(f"Failed to update session summary: {e}")
+        finally:
+            with self._lock:
+                if state.get("session_group") == session_group:
+                    state["folding"] = False
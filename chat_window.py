@@ -0,0 +1,72 @@
+# Windowed chat view: session_state keeps only the newest messages of a session, older turns are
+# fetched from session_history a page at a time, and each message's HTML bubble is built once.
+
+# Fetch up to `limit` turns of a session, newest first from the before_id keyset cursor (or from the newest row),
+# after skipping `skip` rows; returned oldest first as (session_id, query, response)
+def fetch_turns(c, user_id, session_group, before_id=None, limit=20, skip=0):
+    if before_id is None:
+        c.execute("""
+            SELECT session_id, query, response FROM session_history
+            WHERE user_id=%s AND session_group=%s
+            ORDER BY session_id DESC
+            LIMIT %s OFFSET %s
+        """, (user_id, session_group, limit, skip))
+    else:
+        c.execute("""
+            SELECT session_id, query, response FROM session_history
+            WHERE user_id=%s AND session_group=%s AND session_id < %s
+            ORDER BY session_id DESC
+            LIMIT %s OFFSET %s
+        """, (user_id, session_group, before_id, limit, skip))
+    return list(reversed(c.fetchall()))
+
+def turns_to_messages(rows):
+    messages = []
+    for session_id, query, response in rows:
+        messages.append({"role": "You", "content": query, "id": session_id})
+        messages.append({"role": "Assistant", "content": response, "id": session_id})
+    return messages
+
+# Load the newest turns of a session; returns (messages, offset) where offset counts the older messages left in the database
+def load_latest(c, user_id, session_group, max_messages):
+    rows = fetch_turns(c, user_id, session_group, limit=max_messages // 2)
+    c.execute("SELECT message_count FROM sessions WHERE user_id=%s AND session_group=%s", (user_id, session_group))
+    row = c.fetchone()
+    total_turns = max(row[0] if row else 0, len(rows))
+    return turns_to_messages(rows), 2 * (total_turns - len(rows))
+
+# Fetch the page of turns just before the window. Messages from this script's own turns carry no id yet,
+# so while the window holds only those, the newest rows are skipped by count instead of by keyset.
+def load_older(c, user_id, session_group, messages, page_turns):
+    before_id = messages[0].get("id") if messages else None
+    skip = 0 if before_id is not None else len(messages) // 2
+    return turns_to_messages(fetch_turns(c, user_id, session_group, before_id, page_turns, skip))
+
+# Drop whole turns from the front until at most max_messages remain; returns (messages, offset)
+def trim_window(messages, offset, max_messages):
+    excess = len(messages) - max_messages
+    if excess <= 0:
+        return messages, offset
+    excess += excess % 2
+    return messages[excess:], offset + excess
+
+# Build the HTML bubble for a message once and keep it on the message for later reruns
+def message_html(message, user_html, assistant_html):
+    html = message.get("html")
+    if html is None:
+        html = user_html(message["content"]) if message["role"] == "You" else assistant_html(message["content"])
+        message["html"] = html
+    return html
+
+# Group consecutive bubbles into one markdown block, breaking only where a message has an audio player.
+# Yields ("html", markup) and ("audio", path, format) items in display order.
+def render_items(messages, user_html, assistant_html):
+    pending = []
+    for message in messages:
+        pending.append(message_html(message, user_html, assistant_html))
+        if message.get("audio"):
+            yield ("html", "".join(pending))
+            pending = []
+            yield ("audio", message["audio"], message.get("audio_format", "audio/mp3"))
+    if pending:
+        yield ("html", "".join(pending))
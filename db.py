@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from metrics import span
+
+# Open a single connection to Neon PostgreSQL using credentials from environment variables
+def connect_from_env():
+    return psycopg2.connect(
+        host=os.getenv("PG_HOST"),
+        port=os.getenv("PG_PORT", "5432"),
+        user=os.getenv("PG_USER"),
+        password=os.getenv("PG_PASSWORD"),
+        database=os.getenv("PG_DATABASE", "linkedin"),
+        sslmode=os.getenv("PG_SSLMODE", "require")
+    )
+
+class PoolExhausted(Exception):
+    pass
+
+# Process-wide pool of PostgreSQL connections shared by every Streamlit session.
+# Connections are handed out per script run and returned afterwards, so the TLS
+# handshake and login round trips are paid once per connection instead of once per rerun.
+class ConnectionPool:
+    def __init__(self, connect=connect_from_env, max_size=10, min_size=1, idle_timeout=300,
+                 health_check_interval=30, checkout_timeout=10):
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._idle = []  # (connection, returned_at) pairs, most recently returned last
+        self._in_use = set()
+        self._opening = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.created = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.reused = 0
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        conn = self._connect()
+        self.created += 1
+        return conn
+
+    def _discard(self, conn):
+        self.discarded += 1
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    # Run a cheap round trip to confirm a connection that sat idle is still usable
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            print(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    # Close connections that have been idle longer than idle_timeout, keeping min_size warm
+    def evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            keep = []
+            for conn, returned_at in self._idle:
+                if now - returned_at > self.idle_timeout and len(self._idle) - len(expired) > self.min_size:
+                    expired.append(conn)
+                else:
+                    keep.append((conn, returned_at))
+            self._idle = keep
+        for conn in expired:
+            self._discard(conn)
+        return len(expired)
+
+    # Timed as the db_checkout phase: waiting for a free slot, the health check and any new connection,
+    # with PoolExhausted counted as a phase error
+    def getconn(self, timeout=None):
+        with span("db_checkout"):
+            return self._checkout(timeout)
+
+    def _checkout(self, timeout):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self.evict_idle()
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolExhausted("Connection pool is closed.")
+                candidate = None
+                if self._idle:
+                    candidate = self._idle.pop()
+                elif len(self._in_use) + self._opening < self.max_size:
+                    # Reserve the slot before connecting so concurrent callers respect max_size
+                    self._opening += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhausted(f"No database connection available within {timeout}s (max_size={self.max_size}).")
+                    self._cond.wait(remaining)
+                    continue
+
+            if candidate is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+                    self.checkouts += 1
+                return conn
+
+            conn, returned_at = candidate
+            if self._is_healthy(conn, time.monotonic() - returned_at):
+                with self._cond:
+                    self._in_use.add(conn)
+                    self.checkouts += 1
+                    self.reused += 1
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, discard=False):
+        if conn is None:
+            return
+        if not discard and not conn.closed:
+            try:
+                # Never hand a half-finished transaction to the next script run
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                pass
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            self.putconn(conn, discard=True)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+                "created": self.created,
+                "discarded": self.discarded,
+                "checkouts": self.checkouts,
+                "reused": self.reused,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
@@ -0,0 +1,145 @@
+import math
+import re
+
+# Local intent classification for chat queries: keyword rules first, then a small naive Bayes model
+# trained on the seed phrases below. Runs in microseconds and never touches the network.
+
+PROFILE_ANALYSIS = "profile_analysis"
+JOB_FIT = "job_fit"
+CONTENT_ENHANCEMENT = "content_enhancement"
+CAREER_GUIDANCE = "career_guidance"
+COVER_LETTER = "cover_letter"
+PREVIOUS_QUESTION = "previous_question"
+GENERAL = "general"
+
+# Unambiguous phrasings, checked in order; the first match wins
+KEYWORD_RULES = [
+    # Only a bare request for the last question is answered without the LLM; anything asking about its content
+    # ("what did i say about my skills", "my previous question about the cover letter") goes to general
+    (PREVIOUS_QUESTION, re.compile(r"^\W*((what|which)\s+(was|is)\s+)?((my|the)\s+)?(previous|last|earlier|prior)\s+(question|query|message)\W*$"
+                                   r"|^\W*what\s+(did|was\s+it\s+that)\s+i\s+(just\s+)?ask(ed)?(\s+you)?(\s+(before|earlier|last))?\W*$")),
+    # Questions about an earlier answer ("the match score you gave me") or an earlier question's content need the
+    # history, not a fresh task run; the unified prompt answers them from the conversation
+    (GENERAL, re.compile(r"\b(previous|last|earlier|prior)\s+(question|query|message)s?\b|\byou\s+(just\s+)?(gave|said|told|suggested|wrote|mentioned|recommended)\b|\bdid\s+you\s+(give|say|suggest|recommend)\b|\b(earlier|before|previously),?\s+you\b")),
+    (COVER_LETTER, re.compile(r"\bcover\s*letter\b")),
+    (JOB_FIT, re.compile(r"\bjob\s*(fit|match)|\b(analy[sz]e|assess|evaluate)\s+(the\s+|this\s+|my\s+)?job\b|\bmatch\s+score\b|\bam\s+i\s+(a\s+)?(good\s+)?(fit|match)")),
+    (CONTENT_ENHANCEMENT, re.compile(r"\b(enhance|improve|rewrite|polish|optimi[sz]e)\s+(my\s+)?(content|profile|headline|summary|about|experience)")),
+    (CAREER_GUIDANCE, re.compile(r"\bcareer\s+(guidance|advice|counsel\w*|path|growth|plan)|\bcounsel\w*\b|\bskill\s+gaps?\b")),
+    (PROFILE_ANALYSIS, re.compile(r"\b(analy[sz]e|review|assess|evaluate|critique)\s+(my\s+)?profile\b|\bprofile\s+(analysis|review)\b")),
+]
+
+# Seed phrases for the fallback model; extend these when a real query lands in the wrong task
+TRAINING_EXAMPLES = {
+    PROFILE_ANALYSIS: [
+        "what do you think of my profile", "is my linkedin profile any good", "what are the weak points of my profile",
+        "how strong is my profile", "what is missing from my profile", "give me feedback on my profile",
+        "how does my profile look to recruiters", "strengths and weaknesses of my profile",
+    ],
+    JOB_FIT: [
+        "how well do i match this role", "should i apply for this position", "do i qualify for this job",
+        "how suitable am i for the position", "what are my chances for this role", "score me against the job description",
+        "compare my profile with the job", "do my skills match the requirements",
+    ],
+    CONTENT_ENHANCEMENT: [
+        "make my about section better", "write a better headline for me", "reword my experience bullets",
+        "make my summary sound more professional", "help me write my about section", "tailor my profile to the job",
+        "suggest a stronger headline", "fix the wording of my experience",
+    ],
+    CAREER_GUIDANCE: [
+        "what should i learn next", "how do i become a staff engineer", "which certifications should i get",
+        "how can i move into management", "what skills do i need for my goals", "how do i switch careers into data science",
+        "what are good next steps for me", "how do i reach my career goals",
+    ],
+    COVER_LETTER: [
+        "write an application letter for this job", "draft a letter to the hiring manager", "help me apply with a letter",
+        "write me a motivation letter", "compose a letter for this application", "draft my job application letter",
+    ],
+    PREVIOUS_QUESTION: [
+        "what did i ask before", "repeat my question", "what was my question", "remind me what i asked",
+        "say my last message again", "what did i just ask you",
+    ],
+    GENERAL: [
+        "hello", "thanks", "how are you", "what can you do", "who are you", "help", "ok great", "tell me a joke",
+    ],
+}
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Words that say nothing about the task; left out of unigram features so shared filler ("is my ... for")
+# can't make the model confident on its own. They still count inside bigrams with a content word.
+STOPWORDS = frozenset("""
+    a about am an and any are as at be can could did do does for from get give have help how i i'm in is it me my
+    of on or please should so tell than that the this to was were what when where which who why will with would you your
+""".split())
+
+def _features(text):
+    words = _WORD.findall(text.lower())
+    return [w for w in words if w not in STOPWORDS] + [
+        f"{a}_{b}" for a, b in zip(words, words[1:]) if a not in STOPWORDS or b not in STOPWORDS
+    ]
+
+# Multinomial naive Bayes with Laplace smoothing over unigrams and bigrams
+class NaiveBayesIntentModel:
+    def __init__(self, examples=TRAINING_EXAMPLES, alpha=1.0):
+        self.alpha = alpha
+        self.vocabulary = set()
+        self.word_counts = {}
+        self.totals = {}
+        self.priors = {}
+        total_examples = sum(len(phrases) for phrases in examples.values())
+        for task, phrases in examples.items():
+            counts = {}
+            for phrase in phrases:
+                for feature in _features(phrase):
+                    counts[feature] = counts.get(feature, 0) + 1
+                    self.vocabulary.add(feature)
+            self.word_counts[task] = counts
+            self.totals[task] = sum(counts.values())
+            self.priors[task] = math.log(len(phrases) / total_examples)
+
+    # Features of text the model has seen in training
+    def known_features(self, text):
+        return [f for f in _features(text) if f in self.vocabulary]
+
+    # Posterior probability per task
+    def predict_proba(self, text):
+        features = self.known_features(text)
+        vocabulary_size = len(self.vocabulary)
+        log_scores = {}
+        for task, counts in self.word_counts.items():
+            denominator = self.totals[task] + self.alpha * vocabulary_size
+            log_scores[task] = self.priors[task] + sum(math.log((counts.get(f, 0) + self.alpha) / denominator) for f in features)
+        peak = max(log_scores.values())
+        exp_scores = {task: math.exp(score - peak) for task, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {task: score / total for task, score in exp_scores.items()}
+
+# A misrouted query gets the wrong kind of answer from a slim prompt, while "general" (the unified prompt)
+# can answer anything, so the model is only trusted when it is clearly confident and the query shares
+# at least min_known_features content words or bigrams with the training phrases
+class IntentRouter:
+    def __init__(self, model=None, min_confidence=0.75, min_known_features=1):
+        self.model = model or NaiveBayesIntentModel()
+        self.min_confidence = min_confidence
+        self.min_known_features = min_known_features
+
+    # Returns (task, confidence, method) where method is "keyword", "model" or "fallback"
+    def route(self, query):
+        text = query.lower()
+        for task, pattern in KEYWORD_RULES:
+            if pattern.search(text):
+                return task, 1.0, "keyword"
+        if len(self.model.known_features(text)) < self.min_known_features:
+            return GENERAL, 0.0, "fallback"
+        probabilities = self.model.predict_proba(text)
+        task = max(probabilities, key=probabilities.get)
+        if probabilities[task] >= self.min_confidence:
+            return task, probabilities[task], "model"
+        return GENERAL, probabilities[task], "fallback"
+
+# Answer "what was my last question" from the chat history with no LLM call
+def answer_previous_question(chat_history):
+    questions = [msg["content"] for msg in chat_history if msg["role"] == "You"]
+    if not questions:
+        return "You haven’t asked anything yet in this session."
+    return f"Your last question was: \"{questions[-1]}\""
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Local TF-IDF pre-ranking of job postings against a profile, so only the best matches are sent to the LLM.
+# Terms are hashed into a fixed feature space, which lets postings be added at any time without refitting a vocabulary.
+# Postings are stored as segments of raw term frequencies in column-major (per-term) layout; IDF weights and
+# document norms are derived from them lazily, so adding postings never rewrites existing segments.
+
+N_FEATURES = 2 ** 18
+SKILL_WEIGHT = 3.0  # a listed skill counts as much as three mentions in free text
+MAX_SEGMENTS = 8
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_SKILL_SPLIT = re.compile(r"[,;|/\n]+")
+_STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or our that the this to was we were will with you your
+    who what which while their they them into over under about than then also other such can may must should would
+""".split())
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS and len(t) > 1]
+
+def _feature(term):
+    return zlib.crc32(term.encode()) % N_FEATURES
+
+# Map posting or profile fields to {feature: weighted term frequency}; skills become whole-phrase features
+def featurize(skills="", text=""):
+    counts = {}
+    for token in tokenize(text):
+        f = _feature(token)
+        counts[f] = counts.get(f, 0.0) + 1.0
+    for skill in _SKILL_SPLIT.split((skills or "").lower()):
+        skill = " ".join(tokenize(skill))
+        if skill:
+            f = _feature("skill:" + skill)
+            counts[f] = counts.get(f, 0.0) + SKILL_WEIGHT
+            # Also credit the words of the skill so "machine learning" meets "learning" in a description
+            for token in skill.split():
+                f = _feature(token)
+                counts[f] = counts.get(f, 0.0) + 1.0
+    return {f: 1.0 + np.log(c) for f, c in counts.items()}
+
+def job_features(job):
+    text = " ".join(str(job.get(field) or "") for field in ("title", "description"))
+    return featurize(job.get("skills") or "", text)
+
+# One immutable block of postings in compressed sparse column form
+class _Segment:
+    def __init__(self, doc_offset, rows, cols, tfs, n_docs):
+        order = np.argsort(cols, kind="stable")
+        self.doc_offset = doc_offset
+        self.n_docs = n_docs
+        self.rows = rows[order].astype(np.int32)
+        self.tfs = tfs[order].astype(np.float32)
+        counts = np.bincount(cols, minlength=N_FEATURES)
+        self.col_ptr = np.zeros(N_FEATURES + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.col_ptr[1:])
+        self.cols = cols[order].astype(np.int32)
+        self.norms = None
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.tfs.nbytes + self.col_ptr.nbytes + self.cols.nbytes + (self.norms.nbytes if self.norms is not None else 0)
+
+    def refresh_norms(self, idf):
+        weighted = self.tfs * idf[self.cols]
+        self.norms = np.sqrt(np.bincount(self.rows, weights=weighted * weighted, minlength=self.n_docs)).astype(np.float32)
+        self.norms[self.norms == 0] = 1.0
+
+    def scores(self, query_cols, query_weights):
+        starts = self.col_ptr[query_cols]
+        ends = self.col_ptr[query_cols + 1]
+        lengths = ends - starts
+        if not lengths.any():
+            return np.zeros(self.n_docs, dtype=np.float32)
+        idx = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s])
+        weights = np.repeat(query_weights, lengths) * self.tfs[idx]
+        return (np.bincount(self.rows[idx], weights=weights, minlength=self.n_docs) / self.norms).astype(np.float32)
+
+class JobIndex:
+    def __init__(self):
+        self.job_ids = []
+        self.df = np.zeros(N_FEATURES, dtype=np.int32)
+        self.segments = []
+        self._idf = None
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    @property
+    def nbytes(self):
+        return self.df.nbytes + sum(segment.nbytes for segment in self.segments)
+
+    # Append postings as a new segment; [(job_id, job_dict)] or pre-featurized [(job_id, {feature: tf})]
+    def add(self, jobs, featurized=False):
+        rows, cols, tfs = [], [], []
+        offset = len(self.job_ids)
+        for local_row, (job_id, job) in enumerate(jobs):
+            features = job if featurized else job_features(job)
+            self.job_ids.append(job_id)
+            rows.extend([local_row] * len(features))
+            cols.extend(features.keys())
+            tfs.extend(features.values())
+        n_docs = len(self.job_ids) - offset
+        if not n_docs:
+            return 0
+        cols = np.asarray(cols, dtype=np.int64)
+        self.df += np.bincount(cols, minlength=N_FEATURES).astype(np.int32)
+        self.segments.append(_Segment(offset, np.asarray(rows, dtype=np.int32), cols, np.asarray(tfs, dtype=np.float32), n_docs))
+        self._idf = None
+        if len(self.segments) > MAX_SEGMENTS:
+            self._merge()
+        return n_docs
+
+    # Fold all segments into one so query cost doesn't grow with the number of add() calls
+    def _merge(self):
+        rows, cols, tfs = [], [], []
+        for segment in self.segments:
+            rows.append(segment.rows.astype(np.int64) + segment.doc_offset)
+            cols.append(segment.cols.astype(np.int64))
+            tfs.append(segment.tfs)
+        self.segments = [_Segment(0, np.concatenate(rows), np.concatenate(cols), np.concatenate(tfs), len(self.job_ids))]
+        self._idf = None
+
+    def _prepare(self):
+        if self._idf is None:
+            n = max(1, len(self.job_ids))
+            self._idf = (np.log((1.0 + n) / (1.0 + self.df)) + 1.0).astype(np.float32)
+            for segment in self.segments:
+                segment.refresh_norms(self._idf)
+        return self._idf
+
+    # Cosine similarity of the profile against every posting; returns the top k as [(job_id, score)]
+    def rank(self, skills="", text="", k=20):
+        if not self.job_ids or k <= 0:
+            return []
+        idf = self._prepare()
+        features = featurize(skills, text)
+        if not features:
+            return []
+        query_cols = np.fromiter(features.keys(), dtype=np.int64)
+        query_weights = np.fromiter(features.values(), dtype=np.float32) * idf[query_cols]
+        query_norm = float(np.linalg.norm(query_weights)) or 1.0
+        # Score against idf-weighted document terms: q_t * idf_t * tf_dt
+        query_weights = query_weights * idf[query_cols] / query_norm
+        scores = np.concatenate([segment.scores(query_cols, query_weights) for segment in self.segments])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.job_ids[i], float(scores[i])) for i in top]
+
+    # Saved to exactly `path` (np.savez would append .npz to a bare filename and the next run would not find it),
+    # via a temp file so an interrupted save never leaves a truncated index behind
+    def save(self, path):
+        if len(self.segments) > 1:
+            self._merge()
+        segment = self.segments[0] if self.segments else None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                job_ids=np.asarray(json.dumps(self.job_ids)),
+                df=self.df,
+                rows=segment.rows if segment else np.zeros(0, dtype=np.int32),
+                cols=segment.cols if segment else np.zeros(0, dtype=np.int32),
+                tfs=segment.tfs if segment else np.zeros(0, dtype=np.float32),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path) as data:
+            index.job_ids = json.loads(str(data["job_ids"]))
+            index.df = data["df"]
+            if index.job_ids:
+                index.segments = [_Segment(0, data["rows"], data["cols"].astype(np.int64), data["tfs"], len(index.job_ids))]
+        return index
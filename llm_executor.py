@@ -0,0 +1,343 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Hedged execution across several LLM backends. A request streams from the first healthy backend; if no token
+# has arrived after that backend's recent p95 time to first token, the same request goes to the next backend and
+# whichever answers first wins. The loser stops being read and its stream is closed. Backends that keep failing
+# are skipped by a per-backend circuit breaker, failures before the first token fail over to the next backend
+# (or, when none is left, are retried with backoff), and every request has an overall deadline.
+
+# Base for every way a request can end without a complete answer, so callers can catch them together
+class LLMUnavailable(Exception):
+    pass
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+class AllBackendsFailed(LLMUnavailable):
+    pass
+
+# The winning backend failed after it had started answering; the partial answer cannot be resumed elsewhere
+class StreamInterrupted(LLMUnavailable):
+    pass
+
+# Closed -> open after failure_threshold consecutive failures; after reset_timeout one probe request is let
+# through (half-open) and its outcome closes or re-opens the breaker
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    # A cancelled hedge tells us nothing about the backend's health
+    def record_cancel(self):
+        with self._lock:
+            self.probe_in_flight = False
+
+# Rolling latency samples and counters for one backend
+class BackendStats:
+    def __init__(self, window=200):
+        self.first_token = deque(maxlen=window)
+        self.total = deque(maxlen=window)
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.hedges = 0
+        self.wins = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def add(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def observe(self, samples, seconds):
+        with self._lock:
+            samples.append(seconds)
+
+    def percentile(self, samples, q):
+        with self._lock:
+            ordered = sorted(samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+class Backend:
+    def __init__(self, name, model, breaker=None, window=200):
+        self.name = name
+        # Any LangChain chat model with .stream(messages)
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = BackendStats(window)
+
+# One in-flight call to a backend, read on its own thread and pushed onto the request's event queue
+class _Attempt:
+    def __init__(self, backend, hedge):
+        self.backend = backend
+        self.hedge = hedge
+        self.started = time.monotonic()
+        self.cancelled = threading.Event()
+        self.failed = False
+
+    def run(self, messages, kwargs, events):
+        stats = self.backend.stats
+        try:
+            stream = self.backend.model.stream(messages, **kwargs)
+            try:
+                first = True
+                for chunk in stream:
+                    if first:
+                        # Recorded even for a cancelled loser so the p95 is not biased towards the fast answers
+                        stats.observe(stats.first_token, time.monotonic() - self.started)
+                        first = False
+                    if self.cancelled.is_set():
+                        break
+                    events.put((self, "chunk", chunk))
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+            if not self.cancelled.is_set():
+                events.put((self, "done", None))
+        except Exception as e:
+            events.put((self, "error", e))
+
+    def cancel(self):
+        if not self.cancelled.is_set():
+            self.cancelled.set()
+            self.backend.stats.add("cancelled")
+            self.backend.breaker.record_cancel()
+
+class HedgedExecutor:
+    def __init__(self, backends, hedge=True, hedge_quantile=0.95, default_hedge_delay=2.0, min_hedge_delay=0.05,
+                 max_hedge_delay=10.0, min_samples=20, deadline=60.0, retries=2, retry_backoff=0.5):
+        self.backends = list(backends)
+        # Backends are created without client-side retries; a failed backend is retried here instead, only once
+        # there is no other backend left to fail over to, with exponential backoff inside the deadline
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.deadline = deadline
+
+    # How long to wait for a backend's first token before hedging: its recent p95, clamped, or a default until it has history
+    def hedge_delay(self, backend):
+        samples = backend.stats.first_token
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        p = backend.stats.percentile(samples, self.hedge_quantile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p))
+
+    # First backend in configured order whose breaker admits a request
+    def _pick(self, exclude):
+        for backend in self.backends:
+            if backend not in exclude and backend.breaker.allow():
+                return backend
+        return None
+
+    def _launch(self, backend, messages, kwargs, events, hedge=False):
+        attempt = _Attempt(backend, hedge)
+        backend.stats.add("requests")
+        if hedge:
+            backend.stats.add("hedges")
+        threading.Thread(target=attempt.run, args=(messages, kwargs, events), name=f"llm-{backend.name}", daemon=True).start()
+        return attempt
+
+    def _fail(self, attempt):
+        attempt.failed = True
+        attempt.backend.stats.add("failures")
+        attempt.backend.breaker.record_failure()
+
+    # Yield message chunks from whichever backend answers first
+    def stream(self, messages, **kwargs):
+        deadline = time.monotonic() + self.deadline
+        events = queue.Queue()
+        attempts = []
+        tried = set()
+
+        primary = self._pick(tried)
+        if primary is None:
+            raise AllBackendsFailed("Every LLM backend has an open circuit breaker.")
+        tried.add(primary)
+        attempts.append(self._launch(primary, messages, kwargs, events))
+        hedge_at = time.monotonic() + self.hedge_delay(primary) if self.hedge else None
+        live = 1
+        last_error = None
+        winner = None
+        retries_used = 0
+        retry_at = None
+        retry_backend = None
+        try:
+            # Wait for the first token from any attempt, hedging and failing over along the way
+            while winner is None:
+                now = time.monotonic()
+                if now >= deadline:
+                    # Attempts still silent at the deadline count against their backends
+                    for attempt in attempts:
+                        if not attempt.cancelled.is_set() and not attempt.failed:
+                            self._fail(attempt)
+                    raise DeadlineExceeded(f"No answer from {', '.join(b.name for b in tried)} within {self.deadline:.0f}s.")
+                wait_until = min(t for t in (deadline, hedge_at, retry_at) if t is not None)
+                try:
+                    attempt, kind, payload = events.get(timeout=max(0.0, wait_until - now))
+                except queue.Empty:
+                    if retry_at is not None and time.monotonic() >= retry_at:
+                        retry_at = None
+                        backend = retry_backend if retry_backend.breaker.allow() else self._pick(set())
+                        if backend is None:
+                            if live == 0:
+                                raise AllBackendsFailed(f"All LLM backends failed; last error: {last_error}") from last_error
+                            continue
+                        attempts.append(self._launch(backend, messages, kwargs, events))
+                        live += 1
+                        if hedge_at is None and self.hedge:
+                            hedge_at = time.monotonic() + self.hedge_delay(backend)
+                        continue
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        hedge_at = None
+                        # Hedge to another backend if one is healthy, otherwise duplicate the request on the same one
+                        backend = self._pick(tried) or (primary if primary.breaker.allow() else None)
+                        if backend is not None:
+                            tried.add(backend)
+                            attempts.append(self._launch(backend, messages, kwargs, events, hedge=True))
+                            live += 1
+                    continue
+                if attempt.cancelled.is_set():
+                    continue
+                if kind == "error":
+                    self._fail(attempt)
+                    live -= 1
+                    last_error = payload
+                    print(f"LLM backend {attempt.backend.name} failed: {payload}")
+                    backend = self._pick(tried)
+                    if backend is not None:
+                        tried.add(backend)
+                        attempts.append(self._launch(backend, messages, kwargs, events))
+                        live += 1
+                    elif live == 0 and retry_at is None:
+                        # Nothing left to fail over to: retry after a backoff if it fits before the deadline
+                        delay = self.retry_backoff * 2 ** retries_used
+                        if retries_used >= self.retries or time.monotonic() + delay >= deadline:
+                            raise AllBackendsFailed(f"All LLM backends failed; last error: {last_error}") from last_error
+                        retries_used += 1
+                        retry_at = time.monotonic() + delay
+                        retry_backend = attempt.backend
+                    continue
+                winner = attempt
+                for other in attempts:
+                    if other is not winner and not other.failed:
+                        other.cancel()
+                winner.backend.stats.add("wins")
+                if kind == "chunk":
+                    yield payload
+                else:
+                    winner.backend.stats.observe(winner.backend.stats.total, time.monotonic() - winner.started)
+                    winner.backend.stats.add("successes")
+                    winner.backend.breaker.record_success()
+                    return
+
+            # Then stream the rest of the winner's answer
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    attempt, kind, payload = events.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    self._fail(winner)
+                    raise DeadlineExceeded(f"{winner.backend.name} did not finish within {self.deadline:.0f}s.")
+                if attempt is not winner:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    winner.backend.stats.observe(winner.backend.stats.total, time.monotonic() - winner.started)
+                    winner.backend.stats.add("successes")
+                    winner.backend.breaker.record_success()
+                    return
+                else:
+                    self._fail(winner)
+                    raise StreamInterrupted(f"{winner.backend.name} failed mid-answer: {payload}") from payload
+        finally:
+            # Stop reading every stream still open, including the winner's if the caller gave up early
+            for attempt in attempts:
+                attempt.cancelled.set()
+
+    def stats(self):
+        result = {}
+        for backend in self.backends:
+            s = backend.stats
+            p50 = s.percentile(s.first_token, 0.5)
+            p95 = s.percentile(s.first_token, 0.95)
+            total_p95 = s.percentile(s.total, 0.95)
+            result[backend.name] = {
+                "requests": s.requests,
+                "successes": s.successes,
+                "failures": s.failures,
+                "hedges": s.hedges,
+                "wins": s.wins,
+                "cancelled": s.cancelled,
+                "first_token_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "first_token_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "total_p95_ms": round(total_p95 * 1000, 1) if total_p95 is not None else None,
+                "hedge_delay_ms": round(self.hedge_delay(backend) * 1000, 1),
+                "breaker_open": 0 if backend.breaker.state == "closed" else 1,
+            }
+        return result
+
+# Chat model facade over a HedgedExecutor, so it drops into `prompt | llm` chains and stream_chain unchanged
+class HedgedChatModel(BaseChatModel):
+    executor: Any
+
+    @property
+    def _llm_type(self):
+        return "hedged"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if stop is not None:
+            kwargs["stop"] = stop
+        for chunk in self.executor.stream(messages, **kwargs):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        content = "".join(generation.text for generation in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
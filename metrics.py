@@ -0,0 +1,203 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg2
+
+# Lightweight in-process metrics: counters, latency histograms and timing spans around each phase of a
+# chat turn, exported in Prometheus text format and optionally snapshotted to the metrics table.
+# Recording is a perf_counter pair, a bisect and a short critical section, cheap enough to leave on in production.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+# Times a block and records it under `name`; failures are also counted in <name>_errors_total
+class _Span:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.registry.observe("linkedin_phase_duration_seconds", elapsed, {"phase": self.name, **self.labels})
+        # Streamlit's rerun/stop control flow is raised as exceptions; those aren't failures
+        if exc_type is not None and not exc_type.__module__.startswith("streamlit"):
+            self.registry.inc("linkedin_phase_errors_total", {"phase": self.name, **self.labels})
+        return False
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}  # name -> {label_key: value}
+        self._histograms = {}  # name -> {label_key: _Histogram}
+        self._gauges = {}  # name -> callable returning {label_key or (): value}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, labels=None, amount=1):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    # Register a gauge computed on demand at export time, e.g. pool or cache stats; fn returns {labels dict or None: value}
+    def gauge(self, name, fn, help_text=None):
+        self._gauges[name] = fn
+        if help_text:
+            self.describe(name, help_text)
+
+    def span(self, name, **labels):
+        return _Span(self, name, labels)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: (list(h.counts), h.sum, h.count) for k, h in series.items()} for name, series in self._histograms.items()}
+        for name, series in sorted(counters.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(histograms.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        for name, fn in sorted(self._gauges.items()):
+            try:
+                values = fn()
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {e}")
+                continue
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values.items():
+                lines.append(f"{name}{_format_labels(_label_key(dict(labels) if labels else None))} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Cumulative (name, labels, count, sum) rows for every counter and histogram series
+    def snapshot(self):
+        rows = []
+        with self._lock:
+            for name, series in self._counters.items():
+                for key, value in series.items():
+                    rows.append((name, json.dumps(dict(key)), value, None))
+            for name, series in self._histograms.items():
+                for key, histogram in series.items():
+                    rows.append((name, json.dumps(dict(key)), histogram.count, histogram.sum))
+        return rows
+
+    def flush_to_db(self, conn):
+        rows = self.snapshot()
+        if not rows:
+            return 0
+        try:
+            with conn.cursor() as c:
+                c.executemany("INSERT INTO metrics (name, labels, count, sum) VALUES (%s, %s, %s, %s)", rows)
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Failed to write metrics snapshot: {e}")
+            return 0
+        return len(rows)
+
+# Process-wide default registry used by the app
+registry = MetricsRegistry()
+registry.describe("linkedin_phase_duration_seconds", "Time spent in each phase of a script run or chat turn.")
+registry.describe("linkedin_phase_errors_total", "Phases that ended with an exception.")
+
+def span(name, **labels):
+    return registry.span(name, **labels)
+
+# Serve GET /metrics on a daemon thread
+def start_http_exporter(port, metrics_registry=registry, host="0.0.0.0"):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics_registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    print(f"Metrics exporter listening on http://{host}:{port}/metrics")
+    return server
+
+# Periodically append a snapshot of every series to the metrics table on a daemon thread
+def start_db_flusher(pool, interval_seconds, metrics_registry=registry):
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_seconds):
+            try:
+                with pool.connection() as conn:
+                    metrics_registry.flush_to_db(conn)
+            except Exception as e:
+                print(f"Metrics flush failed: {e}")
+
+    threading.Thread(target=loop, name="metrics-flusher", daemon=True).start()
+    return stop
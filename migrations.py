@@ -0,0 +1,152 @@
+import psycopg2
+
+# Arbitrary but fixed key for pg_advisory_lock so concurrent replicas migrate one at a time
+MIGRATION_LOCK_KEY = 7240519
+
+# Ordered schema migrations as (version, description, statements).
+# Never edit a migration that has shipped - append a new one instead.
+MIGRATIONS = [
+    (1, "create users table", [
+        '''CREATE TABLE IF NOT EXISTS users (
+               user_id VARCHAR(255) PRIMARY KEY,
+               password VARCHAR(255),
+               profile_data TEXT,
+               job_data TEXT,
+               career_goals TEXT)''',
+        # Databases created by older versions of the app may lack some of these columns
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS password VARCHAR(255)",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_data TEXT",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS job_data TEXT",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS career_goals TEXT",
+    ]),
+    (2, "create session_history table", [
+        '''CREATE TABLE IF NOT EXISTS session_history (
+               user_id VARCHAR(255),
+               session_group VARCHAR(255),
+               session_id SERIAL PRIMARY KEY,
+               query TEXT,
+               response TEXT,
+               timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (3, "add session_group and backfill legacy sessions", [
+        "ALTER TABLE session_history ADD COLUMN IF NOT EXISTS session_group VARCHAR(255)",
+        "UPDATE session_history SET session_group = 'legacy_session' WHERE session_group IS NULL",
+    ]),
+    (4, "record generation timings on session_history", [
+        "ALTER TABLE session_history ADD COLUMN IF NOT EXISTS ttft_ms INTEGER",
+        "ALTER TABLE session_history ADD COLUMN IF NOT EXISTS generation_ms INTEGER",
+    ]),
+    (5, "create llm_response_cache table", [
+        '''CREATE TABLE IF NOT EXISTS llm_response_cache (
+               user_id VARCHAR(255) NOT NULL,
+               cache_key CHAR(64) NOT NULL,
+               response TEXT NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               expires_at TIMESTAMP NOT NULL,
+               hit_count INTEGER DEFAULT 0,
+               PRIMARY KEY (user_id, cache_key))''',
+        "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires_at ON llm_response_cache (expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_accessed ON llm_response_cache (last_accessed)",
+    ]),
+    (6, "create session_summaries table and record prompt size", [
+        '''CREATE TABLE IF NOT EXISTS session_summaries (
+               user_id VARCHAR(255) NOT NULL,
+               session_group VARCHAR(255) NOT NULL,
+               summary TEXT NOT NULL DEFAULT '',
+               summarized_messages INTEGER NOT NULL DEFAULT 0,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (user_id, session_group))''',
+        "ALTER TABLE session_history ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER",
+    ]),
+    (7, "create sessions summary table and history indexes", [
+        '''CREATE TABLE IF NOT EXISTS sessions (
+               user_id VARCHAR(255) NOT NULL,
+               session_group VARCHAR(255) NOT NULL,
+               first_query TEXT,
+               started_at TIMESTAMP,
+               last_activity TIMESTAMP,
+               message_count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (user_id, session_group))''',
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user_activity ON sessions (user_id, last_activity DESC, session_group DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_session_history_user_group ON session_history (user_id, session_group, session_id)",
+        '''INSERT INTO sessions (user_id, session_group, first_query, started_at, last_activity, message_count)
+           SELECT agg.user_id, agg.session_group, first.query, agg.started_at, agg.last_activity, agg.message_count
+           FROM (
+               SELECT user_id, session_group, MIN(session_id) AS first_id, MIN(timestamp) AS started_at,
+                      MAX(timestamp) AS last_activity, COUNT(*) AS message_count
+               FROM session_history
+               WHERE user_id IS NOT NULL AND session_group IS NOT NULL
+               GROUP BY user_id, session_group
+           ) agg
+           JOIN session_history first ON first.session_id = agg.first_id
+           ON CONFLICT (user_id, session_group) DO NOTHING''',
+    ]),
+    (8, "record the routed task on session_history", [
+        "ALTER TABLE session_history ADD COLUMN IF NOT EXISTS task VARCHAR(64)",
+    ]),
+    (9, "create metrics snapshot table", [
+        '''CREATE TABLE IF NOT EXISTS metrics (
+               id BIGSERIAL PRIMARY KEY,
+               recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               name VARCHAR(255) NOT NULL,
+               labels TEXT,
+               count DOUBLE PRECISION,
+               sum DOUBLE PRECISION)''',
+        "CREATE INDEX IF NOT EXISTS idx_metrics_name_recorded ON metrics (name, recorded_at)",
+    ]),
+]
+
+# Return the highest applied schema version, creating the version table on first run
+def current_version(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                 version INTEGER PRIMARY KEY,
+                 description TEXT,
+                 applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return c.fetchone()[0]
+
+# Apply every pending migration in order, each in its own transaction, under a session-level advisory lock
+def run_migrations(conn, migrations=MIGRATIONS):
+    applied = []
+    c = conn.cursor()
+    try:
+        c.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            version = current_version(c)
+            conn.commit()
+            for target, description, statements in sorted(migrations, key=lambda m: m[0]):
+                if target <= version:
+                    continue
+                try:
+                    for statement in statements:
+                        c.execute(statement)
+                    c.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)", (target, description))
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    print(f"Migration {target} ({description}) failed.")
+                    raise
+                print(f"Applied migration {target}: {description}")
+                applied.append(target)
+                version = target
+        finally:
+            # The advisory lock is session-level, so it survives a rolled back transaction
+            conn.rollback()
+            c.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+    finally:
+        c.close()
+    print(f"Database schema is at version {version}.")
+    return applied
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from db import connect_from_env
+
+    load_dotenv()
+    conn = connect_from_env()
+    try:
+        run_migrations(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+
+from chat_window import load_latest, load_older
+from session_index import fetch_sessions_page, record_message
+from write_behind import USER_COLUMNS
+
+# Data access for the app. Every call borrows a pooled connection only for the statements it runs and
+# returns it straight after, so no connection or cursor is shared between Streamlit sessions (each runs on
+# its own thread) and none is held while an answer is being generated. Safe to share across threads.
+
+class Repository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    # Borrow a connection for callers that manage their own statements (response cache, chat memory)
+    def connection(self, timeout=None):
+        return self.pool.connection(timeout)
+
+    # Cursor for reads; the connection goes back to the pool, rolled back, when the block exits
+    @contextmanager
+    def cursor(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as c:
+                yield c
+
+    # Cursor whose statements commit together when the block exits, or roll back if it raises
+    @contextmanager
+    def transaction(self):
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor() as c:
+                    yield c
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    # Return (profile_data, job_data, career_goals) for a matching login, or None
+    def authenticate(self, user_id, password_hash):
+        with self.cursor() as c:
+            c.execute("SELECT profile_data, job_data, career_goals FROM users WHERE user_id=%s AND password=%s", (user_id, password_hash))
+            return c.fetchone()
+
+    # Raises psycopg2.IntegrityError if the user already exists
+    def create_user(self, user_id, password_hash):
+        with self.transaction() as c:
+            c.execute("INSERT INTO users (user_id, password) VALUES (%s, %s)", (user_id, password_hash))
+
+    def update_user(self, user_id, column, value):
+        if column not in USER_COLUMNS:
+            raise ValueError(f"Unknown users column: {column}")
+        with self.transaction() as c:
+            c.execute(f"UPDATE users SET {column}=%s WHERE user_id=%s", (value, user_id))
+
+    # Store one chat turn and keep the sessions row in step, in a single transaction
+    def insert_turn(self, user_id, session_group, query, response, ttft_ms=None, generation_ms=None, prompt_tokens=None, task=None):
+        with self.transaction() as c:
+            c.execute("INSERT INTO session_history (user_id, session_group, query, response, ttft_ms, generation_ms, prompt_tokens, task) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                      (user_id, session_group, query, response, ttft_ms, generation_ms, prompt_tokens, task))
+            record_message(c, user_id, session_group, query)
+
+    # One keyset page of the user's sessions, served from session_list_cache when one is given;
+    # a connection is borrowed only when the page has to come from the database
+    def sessions_page(self, user_id, after=None, limit=20, session_list_cache=None):
+        if session_list_cache is not None:
+            return session_list_cache.get_page(self.cursor, user_id, after=after, limit=limit)
+        with self.cursor() as c:
+            return fetch_sessions_page(c, user_id, after, limit)
+
+    def latest_turns(self, user_id, session_group, max_messages):
+        with self.cursor() as c:
+            return load_latest(c, user_id, session_group, max_messages)
+
+    def older_turns(self, user_id, session_group, messages, page_turns):
+        with self.cursor() as c:
+            return load_older(c, user_id, session_group, messages, page_turns)
+
+    # Most recent turns across all of the user's sessions, for the legacy fallback view
+    def recent_history(self, user_id, limit=10):
+        with self.cursor() as c:
+            c.execute("SELECT query, response FROM session_history WHERE user_id=%s ORDER BY timestamp DESC LIMIT %s", (user_id, limit))
+            return c.fetchall()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg2
+
+# Two-tier cache of LLM answers keyed on a hash of the rendered prompt inputs.
+# Tier one is an in-process LRU shared by every session; tier two is the llm_response_cache
+# table, shared by every replica. Entries are scoped to a user so saving a profile, job or goals
+# can drop that user's answers in one statement.
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl_seconds=24 * 3600, max_rows=20000, trim_every=100):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.trim_every = trim_every
+        self._entries = OrderedDict()  # (user_id, key) -> (response, expires_at)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    # Content address for one request: the prompt template, model and every variable it is rendered with
+    @staticmethod
+    def make_key(inputs, template="", model=""):
+        payload = json.dumps({"template": template, "model": model, "inputs": inputs}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _remember(self, user_id, key, response, expires_at):
+        with self._lock:
+            self._entries[(user_id, key)] = (response, expires_at)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, conn, user_id, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end((user_id, key))
+                    self.memory_hits += 1
+                    return response
+                del self._entries[(user_id, key)]
+
+        try:
+            with conn.cursor() as c:
+                c.execute("""
+                    UPDATE llm_response_cache
+                    SET last_accessed = CURRENT_TIMESTAMP, hit_count = hit_count + 1
+                    WHERE user_id=%s AND cache_key=%s AND expires_at > CURRENT_TIMESTAMP
+                    RETURNING response, EXTRACT(EPOCH FROM expires_at)
+                """, (user_id, key))
+                row = c.fetchone()
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Response cache lookup failed: {e}")
+            row = None
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        response, expires_at = row
+        self._remember(user_id, key, response, float(expires_at))
+        with self._lock:
+            self.db_hits += 1
+        return response
+
+    def put(self, conn, user_id, key, response):
+        self._remember(user_id, key, response, time.time() + self.ttl_seconds)
+        try:
+            with conn.cursor() as c:
+                c.execute("""
+                    INSERT INTO llm_response_cache (user_id, cache_key, response, expires_at)
+                    VALUES (%s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+                    ON CONFLICT (user_id, cache_key) DO UPDATE
+                    SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at,
+                        created_at = CURRENT_TIMESTAMP, last_accessed = CURRENT_TIMESTAMP
+                """, (user_id, key, response, self.ttl_seconds))
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Response cache write failed: {e}")
+            return
+        with self._lock:
+            self._puts += 1
+            trim = self._puts % self.trim_every == 0
+        if trim:
+            self.trim(conn)
+
+    # Drop expired rows, then the least recently used ones beyond max_rows
+    def trim(self, conn):
+        try:
+            with conn.cursor() as c:
+                c.execute("DELETE FROM llm_response_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+                expired = c.rowcount
+                c.execute("""
+                    DELETE FROM llm_response_cache
+                    WHERE (user_id, cache_key) IN (
+                        SELECT user_id, cache_key FROM llm_response_cache
+                        ORDER BY last_accessed DESC
+                        OFFSET %s
+                    )
+                """, (self.max_rows,))
+                evicted = c.rowcount
+            conn.commit()
+            print(f"Response cache trimmed: {expired} expired, {evicted} evicted.")
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Response cache trim failed: {e}")
+
+    # Drop a user's answers from this process's memory only; the table rows are left to the caller
+    def forget_user(self, user_id):
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[entry_key]
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._entries),
+            }
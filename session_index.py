@@ -0,0 +1,80 @@
+import threading
+
+from psycopg2.extras import execute_values
+
+# Keep the per-user sessions summary row in step with session_history; call in the same transaction as the insert
+def record_message(c, user_id, session_group, query):
+    c.execute("""
+        INSERT INTO sessions (user_id, session_group, first_query, started_at, last_activity, message_count)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1)
+        ON CONFLICT (user_id, session_group) DO UPDATE
+        SET last_activity = CURRENT_TIMESTAMP, message_count = sessions.message_count + 1
+    """, (user_id, session_group, query))
+
+# Batched record_message for many sessions at once; counts maps (user_id, session_group) -> (first_query, new_messages)
+def record_messages(c, counts):
+    if not counts:
+        return
+    execute_values(c, """
+        INSERT INTO sessions (user_id, session_group, first_query, started_at, last_activity, message_count)
+        VALUES %s
+        ON CONFLICT (user_id, session_group) DO UPDATE
+        SET last_activity = EXCLUDED.last_activity, message_count = sessions.message_count + EXCLUDED.message_count
+    """, [(user_id, session_group, first_query, added) for (user_id, session_group), (first_query, added) in counts.items()],
+        template="(%s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, %s)")
+
+# Fetch one page of a user's sessions, newest activity first, continuing after the (last_activity, session_group) cursor
+def fetch_sessions_page(c, user_id, after=None, limit=20):
+    if after is None:
+        c.execute("""
+            SELECT session_group, first_query, last_activity, message_count
+            FROM sessions
+            WHERE user_id=%s
+            ORDER BY last_activity DESC, session_group DESC
+            LIMIT %s
+        """, (user_id, limit))
+    else:
+        c.execute("""
+            SELECT session_group, first_query, last_activity, message_count
+            FROM sessions
+            WHERE user_id=%s AND (last_activity, session_group) < (%s, %s)
+            ORDER BY last_activity DESC, session_group DESC
+            LIMIT %s
+        """, (user_id, after[0], after[1], limit))
+    rows = c.fetchall()
+    next_cursor = (rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+    return rows, next_cursor
+
+# Process-wide cache of sidebar pages per user, dropped as soon as that user writes a new message
+class SessionListCache:
+    def __init__(self, max_users=1000):
+        self.max_users = max_users
+        self._pages = {}  # user_id -> {cursor: (rows, next_cursor)}
+        # user_id -> generation, bumped by invalidate. The page query runs outside the lock, so a page read
+        # before a concurrent invalidate must not be stored after it.
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    # cursor() returns a context manager yielding a cursor, e.g. Repository.cursor; it is only opened on a miss,
+    # so a cached page costs no pooled connection
+    def get_page(self, cursor, user_id, after=None, limit=20):
+        with self._lock:
+            cached = self._pages.get(user_id, {}).get((after, limit))
+            generation = self._generations.get(user_id, 0)
+        if cached is not None:
+            return cached
+        with cursor() as c:
+            page = fetch_sessions_page(c, user_id, after, limit)
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return page
+            if user_id not in self._pages and len(self._pages) >= self.max_users:
+                # Dicts keep insertion order, so this drops the user cached longest ago
+                self._pages.pop(next(iter(self._pages)))
+            self._pages.setdefault(user_id, {})[(after, limit)] = page
+        return page
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._pages.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
@@ -0,0 +1,50 @@
+import time
+from dataclasses import dataclass
+
+# Outcome of one streamed generation, with timings in milliseconds
+@dataclass
+class StreamResult:
+    text: str
+    ttft_ms: float
+    total_ms: float
+    chunks: int
+
+def _chunk_text(chunk):
+    return chunk.content if hasattr(chunk, 'content') else str(chunk)
+
+def _finish(parts, start, first_token_at, chunks):
+    end = time.perf_counter()
+    # An empty stream never produced a first token; report the full wait instead
+    first_token_at = first_token_at if first_token_at is not None else end
+    return StreamResult(
+        text="".join(parts),
+        ttft_ms=(first_token_at - start) * 1000,
+        total_ms=(end - start) * 1000,
+        chunks=chunks
+    )
+
+# Stream a chain's output, calling on_token(delta, text_so_far) for every non-empty chunk
+def stream_chain(chain, inputs, on_token=None):
+    start = time.perf_counter()
+    first_token_at = None
+    parts = []
+    chunks = 0
+    for chunk in chain.stream(inputs):
+        delta = _chunk_text(chunk)
+        if not delta:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        parts.append(delta)
+        chunks += 1
+        if on_token:
+            on_token(delta, "".join(parts))
+    return _finish(parts, start, first_token_at, chunks)
+
+# Blocking call with the same result shape, used when streaming is switched off
+def invoke_chain(chain, inputs):
+    start = time.perf_counter()
+    response = chain.invoke(inputs)
+    text = _chunk_text(response)
+    end = time.perf_counter()
+    return StreamResult(text=text, ttft_ms=(end - start) * 1000, total_ms=(end - start) * 1000, chunks=1)
@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentence boundary: terminal punctuation followed by whitespace, or a blank line
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+# Split text into sentences for chunked synthesis; whitespace-only pieces are dropped
+def split_sentences(text):
+    return [part.strip() for part in _SENTENCE_END.split(text) if part and part.strip()]
+
+# Google Text-to-Speech backend used in production
+class GTTSBackend:
+    extension = "mp3"
+    audio_format = "audio/mp3"
+
+    def __init__(self, lang='en'):
+        self.lang = lang
+
+    def cache_namespace(self):
+        return f"gtts:{self.lang}"
+
+    def synthesize(self, text):
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=self.lang)
+        audio_buffer = io.BytesIO()
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+    # gTTS returns headerless MP3 frames, which play back-to-back when concatenated
+    def join(self, chunks):
+        return b"".join(chunks)
+
+# Local stand-in that writes silent WAV audio sized to the text, with an optional artificial delay.
+# Needs no network, so tests and benchmarks can exercise the whole audio path offline.
+class SilentBackend:
+    extension = "wav"
+    audio_format = "audio/wav"
+
+    def __init__(self, delay_seconds=0.0, seconds_per_char=0.01, sample_rate=8000):
+        self.delay_seconds = delay_seconds
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+
+    def cache_namespace(self):
+        return f"silent:{self.sample_rate}:{self.seconds_per_char}"
+
+    def synthesize(self, text):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        samples = max(1, int(len(text) * self.seconds_per_char * self.sample_rate))
+        return self._wav(b"\x80" * samples)  # 8-bit unsigned PCM midpoint = silence
+
+    # One WAV with the PCM data of every chunk, in order
+    def join(self, chunks):
+        return self._wav(b"".join(chunk[chunk.index(b"data") + 8:] for chunk in chunks))
+
+    def _wav(self, data):
+        header = b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+        header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, self.sample_rate, self.sample_rate, 1, 8)
+        header += b"data" + struct.pack("<I", len(data))
+        return header + data
+
+# Content-addressed store of synthesized audio on disk: one file per (backend, text) hash.
+# Bounded by max_bytes and max_age: a sweep after writes (at most every sweep_interval seconds) deletes
+# expired files, then the least recently used ones until the directory fits.
+class AudioCache:
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024, max_age=7 * 24 * 3600, sweep_interval=60.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, backend, text):
+        digest = hashlib.sha256(f"{backend.cache_namespace()}\n{text}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.{backend.extension}")
+
+    # A joined answer is addressed by its chunks, which are themselves content-addressed
+    def combined_path_for(self, backend, paths):
+        digest = hashlib.sha256(("combined\n" + "\n".join(os.path.basename(p) for p in paths)).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.{backend.extension}")
+
+    def write(self, path, audio):
+        # Write to a temp file first so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        self.maybe_sweep()
+
+    # Mark a cached file as used so the size sweep evicts it last
+    def touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def maybe_sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return 0
+            self._last_sweep = now
+        return self.sweep()
+
+    # Delete expired files, then the oldest until the cache fits in max_bytes; returns how many were removed
+    def sweep(self):
+        now = time.time()
+        files = []
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if not entry.is_file():
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    removed += self._remove(entry.path)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+        if removed:
+            self.evicted += removed
+            print(f"Audio cache sweep removed {removed} files; {total / (1024 * 1024):.1f} MB left")
+        return removed
+
+    def _remove(self, path):
+        # Another process sharing the directory may have removed it already
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+# Synthesizes sentences concurrently on a worker pool and stores them in the audio cache.
+# Callers get back file paths (cheap to keep in session_state) rather than audio bytes.
+class TTSPipeline:
+    def __init__(self, backend, cache, max_workers=4):
+        self.backend = backend
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self.cache_hits = 0
+        self.synthesized = 0
+
+    @property
+    def audio_format(self):
+        return self.backend.audio_format
+
+    def _synthesize_to_cache(self, text):
+        path = self.cache.path_for(self.backend, text)
+        if self.cache.touch(path):
+            self.cache_hits += 1
+            return path
+        self.cache.write(path, self.backend.synthesize(text))
+        self.synthesized += 1
+        return path
+
+    # Join synthesized chunks into one file so an answer plays in a single player; returns its path
+    def combine(self, paths):
+        if len(paths) == 1:
+            return paths[0]
+        path = self.cache.combined_path_for(self.backend, paths)
+        if self.cache.touch(path):
+            return path
+        chunks = []
+        for chunk_path in paths:
+            with open(chunk_path, "rb") as f:
+                chunks.append(f.read())
+        self.cache.write(path, self.backend.join(chunks))
+        return path
+
+    # Queue one chunk of text; returns a future resolving to the audio file path
+    def submit(self, text):
+        return self.executor.submit(self._synthesize_to_cache, text)
+
+    # Start an incremental feed that synthesizes sentences while the text is still being generated
+    def feeder(self):
+        return SentenceFeeder(self)
+
+# Accumulates streamed text and hands each completed sentence to the pipeline as soon as it ends
+class SentenceFeeder:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.buffer = ""
+        self.sentences = []
+        self.futures = []
+
+    def feed(self, delta):
+        self.buffer += delta
+        sentences = split_sentences(self.buffer)
+        # The last piece may still be growing unless the buffer ends on a boundary
+        if sentences and not _SENTENCE_END.search(self.buffer[-2:] if len(self.buffer) > 1 else self.buffer):
+            self.buffer = sentences.pop()
+        else:
+            self.buffer = ""
+        for sentence in sentences:
+            self._submit(sentence)
+
+    def _submit(self, sentence):
+        self.sentences.append(sentence)
+        self.futures.append(self.pipeline.submit(sentence))
+
+    # Flush the trailing sentence and return futures for every chunk, in order
+    def finish(self):
+        if self.buffer.strip():
+            self._submit(self.buffer.strip())
+        self.buffer = ""
+        return self.futures
+
+    # Block until every chunk is synthesized, retrying a failed chunk up to `retries` times.
+    # Returns the paths in order, or None if any chunk still failed: audio missing a sentence is worse than none.
+    def wait(self, timeout=None, retries=1):
+        paths = []
+        for sentence, future in zip(self.sentences, self.finish()):
+            for attempt in range(retries + 1):
+                try:
+                    paths.append(future.result(timeout=timeout))
+                    break
+                except Exception as e:
+                    print(f"Audio chunk generation failed (attempt {attempt + 1}): {e}")
+                    future = self.pipeline.submit(sentence)
+            else:
+                return None
+        return paths
@@ -0,0 +1,269 @@
+import atexit
+import threading
+import time
+import weakref
+from collections import deque
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from metrics import registry, span
+from session_index import record_messages
+
+# Background writer that takes chat-history inserts and profile/job/goal updates off the request path.
+# Writes are queued in memory and committed in multi-row batches on a daemon thread, either every
+# flush_interval seconds or as soon as batch_size writes are pending. Reads that must see a user's own
+# writes call sync(user_id) first, and every open queue is drained at interpreter shutdown.
+
+HISTORY = "history"
+USER_UPDATE = "user"
+CACHE_INVALIDATE = "cache_invalidate"
+
+HISTORY_COLUMNS = ("user_id", "session_group", "query", "response", "ttft_ms", "generation_ms", "prompt_tokens", "task")
+USER_COLUMNS = ("profile_data", "job_data", "career_goals")
+
+_open_queues = weakref.WeakSet()
+
+class WriteQueueFull(Exception):
+    pass
+
+# Write one batch of queued operations on the given cursor; the caller commits
+def write_batch(c, batch):
+    history = [item for kind, item in batch if kind == HISTORY]
+    if history:
+        execute_values(c, f"INSERT INTO session_history ({', '.join(HISTORY_COLUMNS)}) VALUES %s", history, page_size=len(history))
+        counts = {}
+        for row in history:
+            first_query, added = counts.get((row[0], row[1]), (row[2], 0))
+            counts[(row[0], row[1])] = (first_query, added + 1)
+        record_messages(c, counts)
+    # Later updates to the same field win, so only the newest value per (user, column) is written
+    updates = {}
+    for kind, item in batch:
+        if kind == USER_UPDATE:
+            user_id, column, value = item
+            updates.setdefault(column, {})[user_id] = value
+    for column, values in updates.items():
+        execute_values(c, f"UPDATE users SET {column} = v.value FROM (VALUES %s) AS v(user_id, value) WHERE users.user_id = v.user_id",
+                       list(values.items()), page_size=len(values))
+    stale_users = sorted({item[0] for kind, item in batch if kind == CACHE_INVALIDATE})
+    if stale_users:
+        c.execute("DELETE FROM llm_response_cache WHERE user_id = ANY(%s)", (stale_users,))
+
+class WriteBehindQueue:
+    def __init__(self, pool, max_pending=10000, batch_size=100, max_batch=1000, flush_interval=0.5,
+                 put_timeout=5.0, on_flush=None):
+        self.pool = pool
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        # Called with the set of user ids after each batch commits, e.g. to drop cached sidebar pages
+        self.on_flush = on_flush
+        self._queue = deque()  # (kind, item) in arrival order
+        self._inflight = []
+        self._pending = {}  # user_id -> queued plus in-flight writes
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        _open_queues.add(self)
+
+    def _put(self, user_id, op):
+        with self._cond:
+            if len(self._queue) >= self.max_pending and not self._closed:
+                # Backpressure: wake the writer and wait for room instead of growing without bound
+                self._flush_requested = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: len(self._queue) < self.max_pending or self._closed, self.put_timeout):
+                    raise WriteQueueFull(f"{len(self._queue)} writes pending; the database is not keeping up.")
+            if self._closed:
+                raise WriteQueueFull("Write queue is closed.")
+            self._queue.append(op)
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def add_history(self, user_id, session_group, query, response, ttft_ms=None, generation_ms=None, prompt_tokens=None, task=None):
+        self._put(user_id, (HISTORY, (user_id, session_group, query, response, ttft_ms, generation_ms, prompt_tokens, task)))
+
+    def update_user(self, user_id, column, value):
+        if column not in USER_COLUMNS:
+            raise ValueError(f"Unknown users column: {column}")
+        self._put(user_id, (USER_UPDATE, (user_id, column, value)))
+
+    # Delete the user's shared cached answers with the next batch. Cache keys include the profile, job and goals,
+    # so entries built from the old data can't be served in the meantime; this only reclaims their rows.
+    def invalidate_response_cache(self, user_id):
+        self._put(user_id, (CACHE_INVALIDATE, (user_id,)))
+
+    # Block until every write queued for user_id so far is committed; returns False on timeout
+    def sync(self, user_id, timeout=5.0):
+        with self._cond:
+            if not self._pending.get(user_id):
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending.get(user_id), timeout)
+
+    # Block until everything queued so far is committed; returns False on timeout
+    def flush(self, timeout=30.0):
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._inflight, timeout)
+
+    # Sessions with uncommitted messages for user_id, most recently active first, as (session_group, first_query)
+    def pending_sessions(self, user_id):
+        with self._cond:
+            groups = {}
+            for kind, item in list(self._inflight) + list(self._queue):
+                if kind == HISTORY and item[0] == user_id:
+                    first_query = groups.pop(item[1], item[2])
+                    groups[item[1]] = first_query
+        return list(reversed(groups.items()))
+
+    # Put sessions with uncommitted messages at the top of a sidebar page of (session_group, first_query, last_activity, message_count) rows
+    def merge_pending_sessions(self, user_id, rows):
+        pending = self.pending_sessions(user_id)
+        if not pending:
+            return rows
+        known = {row[0]: row for row in rows}
+        pending_groups = {group for group, _ in pending}
+        return [known.get(group, (group, first_query, None, 0)) for group, first_query in pending] + \
+               [row for row in rows if row[0] not in pending_groups]
+
+    def _take_batch(self):
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while not (self._closed or self._flush_requested or len(self._queue) >= self.batch_size):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if not self._queue:
+                self._flush_requested = False
+                return None
+            while self._queue and len(self._inflight) < self.max_batch:
+                self._inflight.append(self._queue.popleft())
+            if not self._queue:
+                self._flush_requested = False
+            self._cond.notify_all()
+            return list(self._inflight)
+
+    # Commit a batch; rows that fail for data reasons are retried one by one and dropped if they still fail.
+    # Returns False when the database is unreachable so the batch can be retried later.
+    # Timed as the write_batch phase (checkout excluded), with failed batches counted as phase errors
+    def _write(self, batch):
+        try:
+            with self.pool.connection() as conn:
+                try:
+                    with span("write_batch"):
+                        with conn.cursor() as c:
+                            write_batch(c, batch)
+                        conn.commit()
+                    registry.inc("linkedin_write_rows_total", {"outcome": "written"}, len(batch))
+                    return True
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    raise
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    print(f"Batched write of {len(batch)} rows failed ({e}); retrying row by row.")
+                for op in batch:
+                    try:
+                        with conn.cursor() as c:
+                            write_batch(c, [op])
+                        conn.commit()
+                        registry.inc("linkedin_write_rows_total", {"outcome": "written"})
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                        raise
+                    except psycopg2.Error as e:
+                        conn.rollback()
+                        self.dropped += 1
+                        registry.inc("linkedin_write_rows_total", {"outcome": "dropped"})
+                        print(f"Dropping queued {op[0]} write for {op[1][0]}: {e}")
+                return True
+        except Exception as e:
+            registry.inc("linkedin_write_batch_failures_total")
+            print(f"Write-behind flush failed, will retry: {e}")
+            return False
+
+    def _run(self):
+        failures = 0
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                with self._cond:
+                    if self._closed and not self._queue:
+                        return
+                continue
+            if not self._write(batch):
+                failures += 1
+                with self._cond:
+                    self.failures += 1
+                    # Put the batch back in front so ordering is preserved, then back off
+                    self._queue.extendleft(reversed(self._inflight))
+                    self._inflight = []
+                    self._cond.notify_all()
+                    if self._closed and failures >= 3:
+                        print(f"Giving up on {len(self._queue)} queued writes at shutdown.")
+                        return
+                time.sleep(min(0.1 * 2 ** failures, 10.0))
+                continue
+            failures = 0
+            users = {item[0] for _, item in batch}
+            if self.on_flush:
+                try:
+                    self.on_flush(users)
+                except Exception as e:
+                    print(f"Write-behind flush callback failed: {e}")
+            with self._cond:
+                for _, item in self._inflight:
+                    remaining = self._pending.get(item[0], 0) - 1
+                    if remaining > 0:
+                        self._pending[item[0]] = remaining
+                    else:
+                        self._pending.pop(item[0], None)
+                self.written += len(self._inflight)
+                self.batches += 1
+                self._inflight = []
+                self._cond.notify_all()
+
+    # Stop accepting writes, drain everything still queued and wait for the writer thread
+    def close(self, timeout=30.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            left = len(self._queue) + len(self._inflight)
+        if left:
+            print(f"Write-behind queue closed with {left} unwritten rows.")
+        return left == 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "in_flight": len(self._inflight),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failures": self.failures,
+            }
+
+# Drain every open queue; runs at interpreter shutdown so accepted writes are not lost on a clean exit
+def close_all(timeout=30.0):
+    for queue in list(_open_queues):
+        queue.close(timeout)
+
+atexit.register(close_all)